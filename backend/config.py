@@ -3,22 +3,77 @@ Configuration management for Voice Live Agent.
 Stores all created agents in a JSON file instead of .env
 """
 
-import json
+import asyncio
+import hashlib
+import mmap
 import os
+import threading
+import time
 from pathlib import Path
-from typing import Dict, Optional, List
+from typing import Dict, Iterator, Optional, List, Tuple
 from datetime import datetime
 import logging
 
+import jsonutil
+
 logger = logging.getLogger(__name__)
 
+# Delay before pending changes are written to disk. Agent changes are flushed
+# quickly; last_used timestamp bumps are only flushed opportunistically.
+FLUSH_DELAY = 0.2
+TOUCH_FLUSH_DELAY = 5.0
+
+# A failed scheduled flush is retried after this delay, doubling per
+# consecutive failure up to FLUSH_RETRY_MAX_DELAY
+FLUSH_RETRY_DELAY = 1.0
+FLUSH_RETRY_MAX_DELAY = 60.0
+
+# Config files larger than this are parsed straight from an mmap of the file
+MMAP_THRESHOLD = 1 << 20
+
+_last_iso_cache: Tuple[int, str] = (0, "")
+
+
+def _now_iso() -> str:
+    """Current local time as an ISO 8601 string, at second precision."""
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def _now_iso_cached() -> str:
+    """Like _now_iso, but formats a new string at most once per second."""
+    global _last_iso_cache
+    sec = int(time.time())
+    if sec != _last_iso_cache[0]:
+        _last_iso_cache = (sec, datetime.fromtimestamp(sec).isoformat())
+    return _last_iso_cache[1]
+
 
 class AgentConfig:
     """Manages agent configurations stored in a JSON file."""
     
-    def __init__(self, config_file: str = "agents_config.json"):
-        """Initialize the agent config manager."""
+    def __init__(self, config_file: str = "agents_config.json", pretty: bool = False):
+        """
+        Initialize the agent config manager.
+        
+        Args:
+            config_file: Config file name, relative to the backend directory
+            pretty: Write indented JSON (for debugging) instead of compact JSON
+        """
         self.config_path = Path(__file__).resolve().parent / config_file
+        self._pretty = pretty
+        # Parsed config kept in memory; reloaded only when the file's mtime changes
+        self._cache: Optional[Dict] = None
+        self._cache_mtime_ns: int = 0
+        # (model, name, instructions) hash -> agent_id, rebuilt lazily from the cache
+        self._dedup_index: Optional[Dict[str, str]] = None
+        # Mutations are batched behind a dirty flag and flushed on a timer
+        self._dirty = False
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        # Consecutive failed flushes and the last error, cleared by a successful write
+        self._flush_failures = 0
+        self._flush_error: Optional[str] = None
+        # Serializes read-modify-write of the config and flushes to disk
+        self._lock = threading.RLock()
         self._ensure_config_file()
     
     def _ensure_config_file(self) -> None:
@@ -28,42 +83,160 @@ class AgentConfig:
                 "agents": {},
                 "current_agent_id": None,
                 "metadata": {
-                    "created_at": datetime.now().isoformat(),
-                    "last_updated": datetime.now().isoformat()
+                    "created_at": _now_iso(),
+                    "last_updated": _now_iso()
                 }
             }
             self._save_config(initial_config)
             logger.info(f"Created new config file at {self.config_path}")
     
     def _load_config(self) -> Dict:
-        """Load configuration from JSON file."""
+        """
+        Load configuration from JSON file.
+        
+        The parsed config is cached and returned as-is while the file's mtime
+        is unchanged, so callers share the cached dict and must save any
+        mutation through _mark_dirty.
+        """
+        # Unflushed changes only exist in memory, so the cache wins over the file
+        if self._dirty and self._cache is not None:
+            return self._cache
+        
         try:
-            with open(self.config_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            stat = self.config_path.stat()
+            mtime_ns = stat.st_mtime_ns
+            if self._cache is not None and mtime_ns == self._cache_mtime_ns:
+                return self._cache
+            
+            if stat.st_size > MMAP_THRESHOLD:
+                # Avoid copying large files through a read() buffer first
+                with open(self.config_path, 'rb') as f, \
+                        mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    with memoryview(mm) as view:
+                        config = jsonutil.loads(view)
+            else:
+                config = jsonutil.loads(self.config_path.read_bytes())
+            self._cache = config
+            self._dedup_index = None
+            self._cache_mtime_ns = mtime_ns
+            return config
         except Exception as e:
             logger.error(f"Failed to load config: {e}")
-            return {
+            # Cache the empty config so pending mutations on it get flushed,
+            # but keep mtime at 0 so the next read retries the file
+            self._cache = {
                 "agents": {},
                 "current_agent_id": None,
                 "metadata": {
-                    "created_at": datetime.now().isoformat(),
-                    "last_updated": datetime.now().isoformat()
+                    "created_at": _now_iso(),
+                    "last_updated": _now_iso()
                 }
             }
+            self._cache_mtime_ns = 0
+            self._dedup_index = None
+            return self._cache
     
     def _save_config(self, config: Dict) -> None:
         """Save configuration to JSON file."""
         try:
             # Update metadata
-            config["metadata"]["last_updated"] = datetime.now().isoformat()
+            config["metadata"]["last_updated"] = _now_iso_cached()
             
-            with open(self.config_path, 'w', encoding='utf-8') as f:
-                json.dump(config, f, indent=2, ensure_ascii=False)
+            data = jsonutil.dumps(config, pretty=self._pretty)
+            
+            # Write to a temp file and swap it in so a crash never leaves a torn file
+            tmp_path = self.config_path.with_suffix(".json.tmp")
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+                f.flush()
+            os.replace(tmp_path, self.config_path)
+            self._cache = config
+            self._cache_mtime_ns = self.config_path.stat().st_mtime_ns
             logger.info("Config saved successfully")
         except Exception as e:
             logger.error(f"Failed to save config: {e}")
             raise
     
+    def _mark_dirty(self, delay: float = FLUSH_DELAY) -> None:
+        """
+        Record that the cached config has unsaved changes and schedule a flush.
+        
+        Without a running event loop (e.g. scripts or startup) the change is
+        written immediately.
+        """
+        self._dirty = True
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush()
+            return
+        
+        when = loop.time() + delay
+        if self._flush_handle is not None:
+            if self._flush_handle.when() <= when:
+                return
+            self._flush_handle.cancel()
+        self._flush_handle = loop.call_at(when, self._scheduled_flush)
+    
+    def _scheduled_flush(self) -> None:
+        """Timer callback for flush; failures are retried with exponential backoff."""
+        self._flush_handle = None
+        try:
+            self.flush()
+        except Exception:
+            # Already logged by _save_config; the dirty flag stays set, so
+            # schedule another attempt instead of waiting for the next change
+            delay = min(
+                FLUSH_RETRY_DELAY * 2 ** (self._flush_failures - 1),
+                FLUSH_RETRY_MAX_DELAY,
+            )
+            logger.warning(f"Retrying config save in {delay:g}s")
+            self._mark_dirty(delay)
+    
+    def flush(self) -> None:
+        """Write any pending changes to disk immediately."""
+        with self._lock:
+            if self._flush_handle is not None:
+                self._flush_handle.cancel()
+                self._flush_handle = None
+            if not self._dirty or self._cache is None:
+                return
+            try:
+                self._save_config(self._cache)
+            except Exception as e:
+                self._flush_failures += 1
+                self._flush_error = str(e)
+                raise
+            self._dirty = False
+            self._flush_failures = 0
+            self._flush_error = None
+    
+    def save_status(self) -> Dict:
+        """
+        Report whether changes are waiting to be written to disk.
+        
+        Returns:
+            {"pending": bool, "error": last write error or None}
+        """
+        return {"pending": self._dirty, "error": self._flush_error}
+    
+    @staticmethod
+    def _dedup_key(model: str, name: str, instructions: str) -> str:
+        """Hash an agent's configuration for duplicate lookups."""
+        data = f"{model}\0{name}\0{instructions}".encode("utf-8")
+        return hashlib.blake2b(data, digest_size=16).hexdigest()
+    
+    def _get_dedup_index(self, config: Dict) -> Dict[str, str]:
+        """Return the duplicate-lookup index, building it from config if needed."""
+        if self._dedup_index is None:
+            index: Dict[str, str] = {}
+            for agent_id, agent in config["agents"].items():
+                key = self._dedup_key(agent["model"], agent["name"], agent["instructions"])
+                # Keep the first match, like the original linear scan
+                index.setdefault(key, agent_id)
+            self._dedup_index = index
+        return self._dedup_index
+    
     def add_agent(
         self, 
         agent_id: str, 
@@ -82,24 +255,33 @@ class AgentConfig:
             instructions: The agent instructions
             set_as_current: Whether to set this as the current active agent
         """
-        config = self._load_config()
-        
-        # Add agent to the agents dictionary
-        config["agents"][agent_id] = {
-            "agent_id": agent_id,
-            "model": model,
-            "name": name,
-            "instructions": instructions,
-            "created_at": datetime.now().isoformat(),
-            "last_used": datetime.now().isoformat()
-        }
-        
-        # Set as current agent if requested
-        if set_as_current:
-            config["current_agent_id"] = agent_id
-        
-        self._save_config(config)
-        logger.info(f"Added agent {agent_id} with name '{name}'")
+        with self._lock:
+            config = self._load_config()
+            
+            if agent_id in config["agents"]:
+                # Overwriting an agent leaves a stale index entry behind
+                self._dedup_index = None
+            else:
+                key = self._dedup_key(model, name, instructions)
+                self._get_dedup_index(config).setdefault(key, agent_id)
+            
+            # Add agent to the agents dictionary
+            now = _now_iso()
+            config["agents"][agent_id] = {
+                "agent_id": agent_id,
+                "model": model,
+                "name": name,
+                "instructions": instructions,
+                "created_at": now,
+                "last_used": now
+            }
+            
+            # Set as current agent if requested
+            if set_as_current:
+                config["current_agent_id"] = agent_id
+            
+            self._mark_dirty()
+            logger.info(f"Added agent {agent_id} with name '{name}'")
     
     def get_agent(self, agent_id: str) -> Optional[Dict]:
         """Get agent details by ID."""
@@ -112,14 +294,20 @@ class AgentConfig:
         current_id = config.get("current_agent_id")
         
         if current_id:
-            agent = config["agents"].get(current_id)
-            if agent:
-                # Update last_used timestamp
-                agent["last_used"] = datetime.now().isoformat()
-                self._save_config(config)
-            return agent
+            return config["agents"].get(current_id)
         return None
     
+    def touch_current_agent(self) -> None:
+        """Update the current agent's last_used timestamp when it is actually used."""
+        with self._lock:
+            config = self._load_config()
+            current_id = config.get("current_agent_id")
+            agent = config["agents"].get(current_id) if current_id else None
+            
+            if agent:
+                agent["last_used"] = _now_iso()
+                self._mark_dirty(TOUCH_FLUSH_DELAY)
+    
     def set_current_agent(self, agent_id: str) -> bool:
         """
         Set an agent as the current active agent.
@@ -127,25 +315,43 @@ class AgentConfig:
         Returns:
             True if successful, False if agent not found
         """
-        config = self._load_config()
-        
-        if agent_id not in config["agents"]:
-            logger.error(f"Agent {agent_id} not found")
-            return False
-        
-        config["current_agent_id"] = agent_id
-        
-        # Update last_used timestamp
-        config["agents"][agent_id]["last_used"] = datetime.now().isoformat()
-        
-        self._save_config(config)
-        logger.info(f"Set current agent to {agent_id}")
-        return True
+        with self._lock:
+            config = self._load_config()
+            
+            if agent_id not in config["agents"]:
+                logger.error(f"Agent {agent_id} not found")
+                return False
+            
+            # Update last_used timestamp
+            config["agents"][agent_id]["last_used"] = _now_iso()
+            
+            if config.get("current_agent_id") == agent_id:
+                # Selection unchanged; only the timestamp needs saving eventually
+                self._mark_dirty(TOUCH_FLUSH_DELAY)
+                return True
+            
+            config["current_agent_id"] = agent_id
+            
+            self._mark_dirty()
+            logger.info(f"Set current agent to {agent_id}")
+            return True
+    
+    def iter_agents(self) -> Iterator[Dict]:
+        """Iterate over stored agents without copying them into a list."""
+        return iter(self._load_config()["agents"].values())
+    
+    def count_agents(self) -> int:
+        """Get the number of stored agents."""
+        return len(self._load_config()["agents"])
     
     def get_all_agents(self) -> List[Dict]:
         """Get all stored agents."""
+        return list(self.iter_agents())
+    
+    def snapshot(self) -> Tuple[List[Dict], Optional[str]]:
+        """Get all stored agents and the current agent ID from a single load."""
         config = self._load_config()
-        return list(config["agents"].values())
+        return list(config["agents"].values()), config.get("current_agent_id")
     
     def update_agent(
         self, 
@@ -160,26 +366,31 @@ class AgentConfig:
         Returns:
             True if successful, False if agent not found
         """
-        config = self._load_config()
-        
-        if agent_id not in config["agents"]:
-            logger.error(f"Agent {agent_id} not found")
-            return False
-        
-        agent = config["agents"][agent_id]
-        
-        if model is not None:
-            agent["model"] = model
-        if name is not None:
-            agent["name"] = name
-        if instructions is not None:
-            agent["instructions"] = instructions
-        
-        agent["last_updated"] = datetime.now().isoformat()
-        
-        self._save_config(config)
-        logger.info(f"Updated agent {agent_id}")
-        return True
+        with self._lock:
+            config = self._load_config()
+            
+            if agent_id not in config["agents"]:
+                logger.error(f"Agent {agent_id} not found")
+                return False
+            
+            agent = config["agents"][agent_id]
+            updates = {"model": model, "name": name, "instructions": instructions}
+            changes = {
+                field: value for field, value in updates.items()
+                if value is not None and agent.get(field) != value
+            }
+            
+            if not changes:
+                # Nothing to change, so skip the write entirely
+                return True
+            
+            agent.update(changes)
+            agent["last_updated"] = _now_iso()
+            self._dedup_index = None
+            
+            self._mark_dirty()
+            logger.info(f"Updated agent {agent_id}")
+            return True
     
     def delete_agent(self, agent_id: str) -> bool:
         """
@@ -188,28 +399,33 @@ class AgentConfig:
         Returns:
             True if successful, False if agent not found
         """
-        config = self._load_config()
-        
-        if agent_id not in config["agents"]:
-            logger.error(f"Agent {agent_id} not found")
-            return False
-        
-        del config["agents"][agent_id]
-        
-        # Clear current_agent_id if this was the current agent
-        if config.get("current_agent_id") == agent_id:
-            config["current_agent_id"] = None
-        
-        self._save_config(config)
-        logger.info(f"Deleted agent {agent_id}")
-        return True
+        with self._lock:
+            config = self._load_config()
+            
+            if agent_id not in config["agents"]:
+                logger.error(f"Agent {agent_id} not found")
+                return False
+            
+            del config["agents"][agent_id]
+            self._dedup_index = None
+            
+            # Clear current_agent_id if this was the current agent
+            if config.get("current_agent_id") == agent_id:
+                config["current_agent_id"] = None
+            
+            self._mark_dirty()
+            logger.info(f"Deleted agent {agent_id}")
+            return True
     
     def clear_current_agent(self) -> None:
         """Clear the current agent selection."""
-        config = self._load_config()
-        config["current_agent_id"] = None
-        self._save_config(config)
-        logger.info("Cleared current agent")
+        with self._lock:
+            config = self._load_config()
+            if config.get("current_agent_id") is None:
+                return
+            config["current_agent_id"] = None
+            self._mark_dirty()
+            logger.info("Cleared current agent")
     
     def agent_exists(self, model: str, name: str, instructions: str) -> Optional[str]:
         """
@@ -219,14 +435,8 @@ class AgentConfig:
             The agent_id if found, None otherwise
         """
         config = self._load_config()
-        
-        for agent_id, agent in config["agents"].items():
-            if (agent["model"] == model and 
-                agent["name"] == name and 
-                agent["instructions"] == instructions):
-                return agent_id
-        
-        return None
+        key = self._dedup_key(model, name, instructions)
+        return self._get_dedup_index(config).get(key)
 
 
 # Global instance
@@ -1,28 +1,35 @@
 from __future__ import annotations
 
 import asyncio
+import functools
 import logging
 from contextlib import asynccontextmanager
-from typing import AsyncGenerator, Dict
+from dataclasses import dataclass
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, List, Mapping, Optional
 
 from fastapi import Depends, FastAPI, HTTPException, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from starlette.exceptions import HTTPException as StarletteHTTPException
+from starlette.websockets import WebSocketClose
 from pydantic import BaseModel
 import os
-import requests
+import httpx
 from pathlib import Path
 from dotenv import load_dotenv
 from azure.ai.projects import AIProjectClient
-from azure.identity import DefaultAzureCredential
 
+import jsonutil
 from session_manager import SessionManager
 from config import agent_config
+from voice_live_client import CREDENTIAL, Event, reload_settings
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
+# Maximum number of queued events coalesced into one websocket frame
+WS_MAX_BATCH = 64
+
 
 class SessionResponse(BaseModel):
     session_id: str
@@ -65,115 +72,100 @@ class AgentCreateResponse(BaseModel):
 
 session_manager = SessionManager()
 
+# Shared async HTTP client for outbound calls; closed in lifespan
+_http_client = httpx.AsyncClient(timeout=30.0)
+
+# Paths resolved once at import; the static build does not change at runtime
+_ENV_PATH = Path(__file__).resolve().parents[1] / ".env"
+_STATIC_DIR = Path(__file__).parent.parent / "static"
+_INDEX_FILE = _STATIC_DIR / "index.html"
+_STATIC_DIR_EXISTS = _STATIC_DIR.exists()
+_INDEX_FILE_EXISTS = _INDEX_FILE.exists()
+# First path segments that keep their 404 instead of falling back to the SPA
+_NON_SPA_ROOTS = frozenset({"api", "sessions", "ws", "health", "static"})
+
 # Load environment variables
-load_dotenv(Path(__file__).resolve().parents[1] / ".env", override=False)
+load_dotenv(_ENV_PATH, override=False)
 
 
-def update_env_file(key: str, value: str) -> None:
-    """Update or add a key-value pair in the .env file."""
-    env_path = Path(__file__).resolve().parents[1] / ".env"
-    
-    # Create .env if it doesn't exist
-    if not env_path.exists():
-        env_path.touch()
-    
-    # Read existing content with UTF-8 encoding
-    lines = []
-    if env_path.exists():
-        with open(env_path, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-    
-    # Update or add the key
-    updated = False
-    for i, line in enumerate(lines):
-        if line.strip().startswith(f"{key}="):
-            lines[i] = f"{key}={value}\n"
-            updated = True
-            break
-    
-    if not updated:
-        lines.append(f"{key}={value}\n")
-    
-    # Write back to file with UTF-8 encoding
-    with open(env_path, 'w', encoding='utf-8') as f:
-        f.writelines(lines)
-    
-    # Update current environment
-    os.environ[key] = value
+@dataclass
+class EnvCache:
+    """Environment-derived settings, read once at startup and on /api/config/reload."""
+    agent_model: str
+    agent_name: str
+    conn_str: str
 
 
-def batch_update_env_file(updates: Dict[str, str]) -> None:
-    """Update multiple key-value pairs in the .env file efficiently."""
-    env_path = Path(__file__).resolve().parents[1] / ".env"
-    
-    # Create .env if it doesn't exist
-    if not env_path.exists():
-        env_path.touch()
-    
-    # Read existing content with UTF-8 encoding
-    lines = []
-    if env_path.exists():
-        with open(env_path, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-    
-    # Update existing keys and track which ones we've updated
-    updated_keys = set()
-    for i, line in enumerate(lines):
-        for key, value in updates.items():
-            if line.strip().startswith(f"{key}="):
-                lines[i] = f"{key}={value}\n"
-                updated_keys.add(key)
-                break
-    
-    # Add new keys that weren't found
-    for key, value in updates.items():
-        if key not in updated_keys:
-            lines.append(f"{key}={value}\n")
-    
-    # Write back to file with UTF-8 encoding
-    with open(env_path, 'w', encoding='utf-8') as f:
-        f.writelines(lines)
-    
-    # Update current environment
-    for key, value in updates.items():
-        os.environ[key] = value
+def load_env_cache() -> EnvCache:
+    return EnvCache(
+        agent_model=os.getenv("AGENT_MODEL", ""),
+        agent_name=os.getenv("AGENT_NAME", ""),
+        conn_str=os.getenv("AZURE_VOICE_LIVE_AGENT_CONNECTION_STRING", ""),
+    )
 
 
-def update_env_batch(updates: dict) -> None:
-    """Update multiple key-value pairs in the .env file efficiently."""
-    env_path = Path(__file__).resolve().parents[1] / ".env"
-    
-    # Create .env if it doesn't exist
-    if not env_path.exists():
-        env_path.touch()
-    
-    # Read existing content
-    lines = []
-    if env_path.exists():
-        with open(env_path, 'r') as f:
-            lines = f.readlines()
+env_cache = load_env_cache()
+
+
+def batch_update_env_file(updates: Mapping[str, str]) -> None:
+    """Update or add key-value pairs in the .env file in a single pass."""
+    # A missing .env is treated as empty; write_bytes creates it below
+    try:
+        data = _ENV_PATH.read_bytes()
+    except FileNotFoundError:
+        data = b""
+    lines = data.decode("utf-8").splitlines(keepends=True)
     
-    # Update existing keys and track which ones were updated
-    updated_keys = set()
-    for i, line in enumerate(lines):
-        for key, value in updates.items():
-            if line.strip().startswith(f"{key}="):
-                lines[i] = f"{key}={value}\n"
-                updated_keys.add(key)
-                break
+    # Replace existing keys with one dict lookup per line
+    out = []
+    found_keys = set()
+    for line in lines:
+        key, sep, _ = line.strip().partition("=")
+        if sep and key in updates:
+            out.append(f"{key}={updates[key]}\n")
+            found_keys.add(key)
+        else:
+            out.append(line)
     
     # Add new keys that weren't found
     for key, value in updates.items():
-        if key not in updated_keys:
-            lines.append(f"{key}={value}\n")
+        if key not in found_keys:
+            out.append(f"{key}={value}\n")
     
-    # Write back to file once
-    with open(env_path, 'w') as f:
-        f.writelines(lines)
+    # Write back to file with a single write
+    _ENV_PATH.write_bytes("".join(out).encode("utf-8"))
     
     # Update current environment
-    for key, value in updates.items():
-        os.environ[key] = value
+    os.environ.update(updates)
+
+
+# Shared project client, created on first agent creation
+_project_client: Optional[AIProjectClient] = None
+_project_client_conn_str: Optional[str] = None
+
+
+def _get_project_client(connection_string: str) -> AIProjectClient:
+    """Return the cached project client, rebuilding it if the connection string changed."""
+    global _project_client, _project_client_conn_str
+    # No awaits in here, so concurrent requests on the event loop cannot race
+    if _project_client is None or _project_client_conn_str != connection_string:
+        if _project_client is not None:
+            _project_client.close()
+        _project_client = AIProjectClient.from_connection_string(
+            credential=CREDENTIAL,
+            conn_str=connection_string,
+        )
+        _project_client_conn_str = connection_string
+    return _project_client
+
+
+def _close_project_client() -> None:
+    """Close the cached project client."""
+    global _project_client, _project_client_conn_str
+    if _project_client is not None:
+        _project_client.close()
+        _project_client = None
+        _project_client_conn_str = None
 
 
 async def create_azure_agent(model: str, name: str, instructions: str) -> str:
@@ -184,18 +176,18 @@ async def create_azure_agent(model: str, name: str, instructions: str) -> str:
         if not connection_string:
             raise ValueError("AZURE_VOICE_LIVE_AGENT_CONNECTION_STRING environment variable is required")
         
-        # Create project client
-        project_client = AIProjectClient.from_connection_string(
-            credential=DefaultAzureCredential(),
-            conn_str=connection_string,
-        )
+        project_client = _get_project_client(connection_string)
         
-        # Create agent
-        agent = project_client.agents.create_agent(
-            model=model,
-            name=name,
-            instructions=instructions,
-            tools=[],  # No tools for now as requested
+        # Create agent; the SDK call is blocking, so keep it off the event loop
+        agent = await asyncio.get_running_loop().run_in_executor(
+            None,
+            functools.partial(
+                project_client.agents.create_agent,
+                model=model,
+                name=name,
+                instructions=instructions,
+                tools=[],  # No tools for now as requested
+            ),
         )
         
         logger.info(f"Created agent with ID: {agent.id}")
@@ -218,19 +210,14 @@ async def warmup_ecom_api():
     try:
         logger.info("Warming up ecom API at %s", warmup_url)
         
-        # Run the blocking requests call in a thread to avoid blocking the event loop
-        loop = asyncio.get_event_loop()
-        response = await loop.run_in_executor(
-            None, 
-            lambda: requests.get(warmup_url, timeout=30)
-        )
+        response = await _http_client.get(warmup_url)
         
         if response.status_code == 200:
             logger.info("Successfully warmed up ecom API - Status: %d", response.status_code)
         else:
             logger.warning("Ecom API warmup returned status %d", response.status_code)
             
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         logger.warning("Failed to warm up ecom API: %s", str(e))
     except Exception as e:
         logger.error("Unexpected error during ecom API warmup: %s", str(e))
@@ -238,14 +225,25 @@ async def warmup_ecom_api():
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:  # pylint: disable=unused-argument
+    global env_cache
     try:
+        env_cache = load_env_cache()
         # Startup: warm up the ecom API
         await warmup_ecom_api()
         yield
     finally:
         # ensure all sessions are cleaned up
         remaining = await session_manager.list_session_ids()
-        await asyncio.gather(*[session_manager.remove_session(session_id) for session_id in remaining])
+        await asyncio.gather(*map(session_manager.remove_session, remaining))
+        # write out any agent config changes still waiting on the flush timer;
+        # a failed write must not skip closing the clients below
+        try:
+            agent_config.flush()
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.error("Failed to flush agent config on shutdown: %s", exc)
+        await _http_client.aclose()
+        _close_project_client()
+        CREDENTIAL.close()
 
 
 app = FastAPI(title="Azure Voice Live Avatar Backend", lifespan=lifespan)
@@ -258,9 +256,8 @@ app.add_middleware(
 )
 
 # Mount static files (frontend build) when in production
-static_dir = Path(__file__).parent.parent / "static"
-if static_dir.exists():
-    app.mount("/static", StaticFiles(directory=static_dir), name="static")
+if _STATIC_DIR_EXISTS:
+    app.mount("/static", StaticFiles(directory=_STATIC_DIR), name="static")
 
 
 @app.get("/health")
@@ -348,9 +345,7 @@ async def update_config(config: ConfigUpdate) -> AgentCreateResponse:
 async def get_all_agents():
     """Get all stored agents"""
     try:
-        agents = agent_config.get_all_agents()
-        current_agent = agent_config.get_current_agent()
-        current_id = current_agent["agent_id"] if current_agent else None
+        agents, current_id = agent_config.snapshot()
         
         return {
             "agents": agents,
@@ -406,8 +401,11 @@ async def delete_agent(agent_id: str):
 @app.post("/api/config/reload")
 async def reload_config():
     """Reload configuration from environment variables"""
+    global env_cache
     # Reload .env file
-    load_dotenv(Path(__file__).resolve().parents[1] / ".env", override=True)
+    load_dotenv(_ENV_PATH, override=True)
+    env_cache = load_env_cache()
+    reload_settings()
     return {"status": "reloaded", "message": "Configuration reloaded successfully"}
 
 
@@ -428,12 +426,15 @@ async def reset_agent():
 async def get_config_status():
     """Get the current configuration status"""
     current_agent = agent_config.get_current_agent()
+    agent_id = current_agent["agent_id"] if current_agent else ""
     return {
         "has_agent": bool(current_agent),
         "agent_id": agent_id,
-        "model": os.getenv("AGENT_MODEL", ""),
-        "agent_name": os.getenv("AGENT_NAME", ""),
-        "ready_for_session": bool(agent_id and os.getenv("AZURE_VOICE_LIVE_AGENT_CONNECTION_STRING"))
+        "model": env_cache.agent_model,
+        "agent_name": env_cache.agent_name,
+        "ready_for_session": bool(agent_id and env_cache.conn_str),
+        # Agent changes not yet on disk, e.g. after a failed write that is being retried
+        "config_save": agent_config.save_status(),
     }
 
 
@@ -447,6 +448,7 @@ async def _ensure_session(session_id: str):
 @app.post("/api/session", response_model=SessionResponse)
 async def create_session() -> SessionResponse:
     session = await session_manager.create_session()
+    agent_config.touch_current_agent()
     return SessionResponse(session_id=session.session_id)
 
 
@@ -461,11 +463,8 @@ async def get_session_status(session_id: str):
 
 @app.post("/api/session/{session_id}/avatar/disconnect")
 async def disconnect_avatar(session_id: str):
+    session = await _ensure_session(session_id)
     try:
-        session = session_manager.get_session(session_id)
-        if not session:
-            raise HTTPException(status_code=404, detail="Session not found")
-            
         await session.disconnect_avatar()
         return {"success": True, "message": "Avatar disconnected"}
         
@@ -503,6 +502,24 @@ async def commit_audio(session_id: str) -> AudioCommitResponse:
     return AudioCommitResponse(status="committed")
 
 
+# Client websocket messages, dispatched by their "type" field
+_WS_HANDLERS: Dict[str, Callable[[Any, Dict[str, Any]], Awaitable[None]]] = {
+    "audio_chunk": lambda session, message: session.send_audio_chunk(message.get("audio")),  # Frontend sends 'audio' field
+    "commit_audio": lambda session, message: session.commit_audio(),
+    "clear_audio": lambda session, message: session.clear_audio(),
+    "user_text": lambda session, message: session.send_user_message(message.get("text", "")),
+    "request_response": lambda session, message: session.request_response(),
+}
+
+
+def _encode_events(batch: List[Event]) -> bytes:
+    """Encode drained session events as one frame, passing pre-serialized events through."""
+    parts = [event if isinstance(event, bytes) else jsonutil.dumps(event) for event in batch]
+    if len(parts) == 1:
+        return parts[0]
+    return b'{"type":"batch","events":[' + b",".join(parts) + b"]}"
+
+
 @app.websocket("/api/ws/{session_id}")
 async def session_ws(websocket: WebSocket, session_id: str):
     await websocket.accept()
@@ -512,13 +529,21 @@ async def session_ws(websocket: WebSocket, session_id: str):
         await websocket.close(code=4404)
         return
 
-    queue = session.create_event_queue()
+    try:
+        queue = session.create_event_queue()
+    except RuntimeError as exc:
+        logger.warning("Rejecting websocket for session %s: %s", session_id, exc)
+        await websocket.close(code=1013)
+        return
 
     async def emitter():
+        drain = queue.drain
+        send_bytes = websocket.send_bytes
         try:
             while True:
-                event = await queue.get()
-                await websocket.send_json(event)
+                # Coalesce events that are already waiting into one frame
+                batch = await drain(WS_MAX_BATCH)
+                await send_bytes(_encode_events(batch))
         except WebSocketDisconnect:
             logger.info("Websocket emitter disconnect for session %s", session_id)
         except Exception as exc:  # pylint: disable=broad-except
@@ -526,25 +551,27 @@ async def session_ws(websocket: WebSocket, session_id: str):
 
     emitter_task = asyncio.create_task(emitter())
 
-    await websocket.send_json({"type": "session_ready", "session_id": session_id})
+    await websocket.send_bytes(jsonutil.dumps({"type": "session_ready", "session_id": session_id}))
 
+    receive = websocket.receive
+    send_audio_bytes = session.send_audio_bytes
     try:
         while True:
-            message = await websocket.receive_json()
+            frame = await receive()
+            if frame["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(frame.get("code", 1000))
+            # Binary frames carry raw PCM16 microphone audio
+            pcm = frame.get("bytes")
+            if pcm is not None:
+                await send_audio_bytes(pcm)
+                continue
+            message = jsonutil.loads(frame["text"])
             msg_type = message.get("type")
-            if msg_type == "audio_chunk":
-                audio_data = message.get("audio")  # Frontend sends 'audio' field
-                await session.send_audio_chunk(audio_data)
-            elif msg_type == "commit_audio":
-                await session.commit_audio()
-            elif msg_type == "clear_audio":
-                await session.clear_audio()
-            elif msg_type == "user_text":
-                await session.send_user_message(message.get("text", ""))
-            elif msg_type == "request_response":
-                await session.request_response()
-            else:
+            handler = _WS_HANDLERS.get(msg_type)
+            if handler is None:
                 logger.warning("Unknown WS message type: %s", msg_type)
+            else:
+                await handler(session, message)
     except WebSocketDisconnect:
         logger.info("Client disconnected from session %s", session_id)
     finally:
@@ -552,20 +579,31 @@ async def session_ws(websocket: WebSocket, session_id: str):
         session.remove_event_queue(queue)
 
 
-# Serve React app for any unmatched routes (SPA fallback)
-@app.get("/{full_path:path}")
-async def serve_spa(full_path: str):
-    """Serve the React SPA for any non-API routes"""
-    static_dir = Path(__file__).parent.parent / "static"
-    
-    # If static files exist and this isn't an API call, serve index.html
-    if static_dir.exists() and not full_path.startswith(("sessions", "ws", "health", "static")):
-        index_file = static_dir / "index.html"
-        if index_file.exists():
-            # Warm up the ecom API when serving the main page to prevent cold start delays
-            if full_path == "" or full_path == "index.html":
-                asyncio.create_task(warmup_ecom_api())
-            return FileResponse(index_file)
-    
-    # Fallback 404 for missing routes
-    raise HTTPException(status_code=404, detail="Not found")
\ No newline at end of file
+class SPAStaticFiles(StaticFiles):
+    """Static files that fall back to index.html so client-side routes resolve."""
+
+    async def __call__(self, scope, receive, send):
+        # The "/" mount also matches websocket scopes, which StaticFiles rejects
+        # with an assertion; close them the way the router does for unknown paths
+        if scope["type"] != "http":
+            if scope["type"] == "websocket":
+                await WebSocketClose()(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+    async def get_response(self, path: str, scope):
+        try:
+            return await super().get_response(path, scope)
+        except StarletteHTTPException as exc:
+            # Unknown API-style paths keep their 404 instead of returning the SPA;
+            # path is OS-normalized, so compare its first segment
+            root = path.replace(os.sep, "/").split("/", 1)[0]
+            if exc.status_code != 404 or root in _NON_SPA_ROOTS:
+                raise
+            return await super().get_response("index.html", scope)
+
+
+# Serve React app for any unmatched routes (SPA fallback). Mounted last so every
+# API and websocket route declared above takes precedence.
+if _STATIC_DIR_EXISTS and _INDEX_FILE_EXISTS:
+    app.mount("/", SPAStaticFiles(directory=_STATIC_DIR, html=True), name="spa")
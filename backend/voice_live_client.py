@@ -2,16 +2,24 @@ from __future__ import annotations
 
 import asyncio
 import base64
-import datetime as dt
-import json
+import binascii
+import copy
+import itertools
 import logging
 import os
+import ssl
+import time
 import uuid
-from collections import defaultdict
+import weakref
+from collections import defaultdict, deque
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, Optional, Set
+from urllib.parse import quote
+from types import MappingProxyType
+from typing import Any, Deque, Dict, FrozenSet, Iterable, List, Mapping, Optional, Tuple, Union
 
 import websockets  # type: ignore[import]
+from azure.core.credentials import AccessToken
 from azure.identity import DefaultAzureCredential
 from websockets import WebSocketClientProtocol  # type: ignore[import]
 
@@ -21,6 +29,7 @@ except ImportError:  # pragma: no cover - older websockets versions
     WebSocketState = None  # type: ignore[assignment]
 
 from dotenv import load_dotenv
+import jsonutil
 from config import agent_config
 
 logger = logging.getLogger(__name__)
@@ -28,6 +37,208 @@ logger = logging.getLogger(__name__)
 # Ensure .env from backend root is loaded when module is imported
 load_dotenv(Path(__file__).resolve().parents[1] / ".env", override=False)
 
+
+@dataclass(frozen=True)
+class VoiceLiveSettings:
+    """Environment-derived Voice Live settings, read once and on reload_settings()."""
+    endpoint: Optional[str]
+    agent_connection_string: Optional[str]
+    api_version: Optional[str]
+    tts_voice: Optional[str]
+    avatar_character: Optional[str]
+    avatar_style: Optional[str]
+    avatar_width: Optional[str]
+    avatar_height: Optional[str]
+    avatar_bitrate: Optional[str]
+    avatar_ice_urls: Optional[str]
+    transcription_languages: str
+    transcription_mode: str
+
+
+def load_settings() -> VoiceLiveSettings:
+    return VoiceLiveSettings(
+        endpoint=os.getenv("AZURE_VOICE_LIVE_ENDPOINT"),
+        agent_connection_string=os.getenv("AZURE_VOICE_LIVE_AGENT_CONNECTION_STRING"),
+        api_version=os.getenv("AZURE_VOICE_LIVE_API_VERSION"),
+        tts_voice=os.getenv("AZURE_TTS_VOICE"),
+        avatar_character=os.getenv("AZURE_VOICE_AVATAR_CHARACTER"),
+        avatar_style=os.getenv("AZURE_VOICE_AVATAR_STYLE"),
+        avatar_width=os.getenv("AZURE_VOICE_AVATAR_WIDTH"),
+        avatar_height=os.getenv("AZURE_VOICE_AVATAR_HEIGHT"),
+        avatar_bitrate=os.getenv("AZURE_VOICE_AVATAR_BITRATE"),
+        avatar_ice_urls=os.getenv("AZURE_VOICE_AVATAR_ICE_URLS"),
+        transcription_languages=os.getenv("AZURE_VOICE_TRANSCRIPTION_LANGUAGES", ""),
+        transcription_mode=os.getenv("AZURE_VOICE_TRANSCRIPTION_MODE", "auto"),
+    )
+
+
+_settings: Optional[VoiceLiveSettings] = None
+# Base session config built from _settings; sessions deep-copy it
+_session_config_template: Optional[Dict[str, Any]] = None
+
+
+def get_settings() -> VoiceLiveSettings:
+    """Return the cached settings, loading them from the environment on first use."""
+    global _settings
+    if _settings is None:
+        _settings = load_settings()
+    return _settings
+
+
+def reload_settings() -> None:
+    """Re-read the environment; sessions created afterwards use the new values."""
+    global _settings, _session_config_template
+    _settings = load_settings()
+    _session_config_template = None
+
+
+# Shared by all sessions and by agent creation in main.py, so the credential
+# chain is only probed once per process
+CREDENTIAL = DefaultAzureCredential()
+
+# Cached tokens are refreshed once they are this close (in seconds) to expiry
+TOKEN_REFRESH_MARGIN = 300
+_TOKEN_CACHE: Dict[str, AccessToken] = {}
+_TOKEN_LOCKS: Dict[str, asyncio.Lock] = {}
+
+
+def _token_is_fresh(token: Optional[AccessToken]) -> bool:
+    return token is not None and token.expires_on - time.time() > TOKEN_REFRESH_MARGIN
+
+
+async def _get_cached_token(scope: str) -> AccessToken:
+    """Return a token for scope, fetching a new one only when the cached token is near expiry."""
+    token = _TOKEN_CACHE.get(scope)
+    if _token_is_fresh(token):
+        return token
+    lock = _TOKEN_LOCKS.get(scope)
+    if lock is None:
+        lock = _TOKEN_LOCKS[scope] = asyncio.Lock()
+    async with lock:
+        # Another session may have refreshed the token while we waited
+        token = _TOKEN_CACHE.get(scope)
+        if not _token_is_fresh(token):
+            token = await asyncio.get_event_loop().run_in_executor(
+                None, CREDENTIAL.get_token, scope
+            )
+            _TOKEN_CACHE[scope] = token
+    return token
+
+
+# Microphone chunks received within this many seconds are sent as one append,
+# unless the buffered PCM reaches AUDIO_COALESCE_MAX_BYTES (~16 KB once base64-encoded)
+AUDIO_COALESCE_DELAY = 0.02
+AUDIO_COALESCE_MAX_BYTES = 12 * 1024
+# A single chunk at least this large (~85 ms of 24 kHz PCM16) is already a
+# reasonable frame, so it is sent at once rather than held for the window;
+# the bundled browser client sends ~8 KB chunks every ~170 ms
+AUDIO_DIRECT_SEND_BYTES = 4 * 1024
+
+# Upper bound on event subscribers (browser websockets) per session
+MAX_EVENT_LISTENERS = 16
+
+# A lagging subscriber is logged on its first dropped event and then every N drops
+SLOW_CONSUMER_LOG_EVERY = 1000
+
+# One TLS context for every Voice Live connection, so CA certificates are
+# loaded once instead of on each connect
+_SSL_CONTEXT = ssl.create_default_context()
+
+# Largest inbound Voice Live message accepted (websockets defaults to 1 MiB)
+WS_MAX_MESSAGE_SIZE = 4 * 1024 * 1024
+
+# Maximum frames queued for the Voice Live websocket; further control events
+# fail rather than wait on a writer that may never catch up
+OUTBOX_SIZE = 512
+# Microphone audio is dropped instead when the outbox is full; logged on the
+# first dropped frame and then every N drops
+AUDIO_DROP_LOG_EVERY = 50
+
+# Seconds to wait for the server SDP answer after session.avatar.connect
+AVATAR_SDP_TIMEOUT = 30
+
+# (voice, transcription language or None) -> serialized session.update body (without event_id)
+_LANGUAGE_UPDATE_BODIES: Dict[Tuple[str, Optional[str]], bytes] = {}
+
+
+def _language_update_body(voice: str, transcription_language: Optional[str] = None) -> bytes:
+    """
+    Return the cached session.update body that switches the response voice and,
+    if transcription_language is given, the transcription language as well.
+    """
+    key = (voice, transcription_language)
+    body = _LANGUAGE_UPDATE_BODIES.get(key)
+    if body is None:
+        session: Dict[str, Any] = {
+            "voice": {
+                "name": voice,
+                "type": "azure-standard",
+                "temperature": 0.8,
+            }
+        }
+        if transcription_language is not None:
+            session["input_audio_transcription"] = {
+                "model": "azure-speech",
+                "language": transcription_language,
+                "primary_language": transcription_language,
+            }
+        body = _LANGUAGE_UPDATE_BODIES[key] = jsonutil.dumps(
+            {"type": "session.update", "session": session}
+        )
+    return body
+
+
+def _expire_future(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_exception(asyncio.TimeoutError())
+
+
+# 🌍 Extended language mapping including Azure Voice Live supported languages
+_LANGUAGE_CONFIG: Mapping[str, Dict[str, str]] = MappingProxyType({
+    # Multilingual model supported languages (Azure Voice Live default)
+    "zh-CN": {"name": "Chinese (China)", "voice": "zh-CN-XiaoxiaoNeural"},
+    "en-AU": {"name": "English (Australia)", "voice": "en-AU-NatashaNeural"},
+    "en-CA": {"name": "English (Canada)", "voice": "en-CA-ClaraNeural"},
+    "en-IN": {"name": "English (India)", "voice": "en-IN-NeerjaNeural"},
+    "en-GB": {"name": "English (United Kingdom)", "voice": "en-GB-SoniaNeural"},
+    "en-US": {"name": "English (United States)", "voice": "en-US-AriaNeural"},
+    "fr-CA": {"name": "French (Canada)", "voice": "fr-CA-SylvieNeural"},
+    "fr-FR": {"name": "French (France)", "voice": "fr-FR-DeniseNeural"},
+    "de-DE": {"name": "German (Germany)", "voice": "de-DE-KatjaNeural"},
+    "hi-IN": {"name": "Hindi (India)", "voice": "hi-IN-SwaraNeural"},
+    "it-IT": {"name": "Italian (Italy)", "voice": "it-IT-ElsaNeural"},
+    "ja-JP": {"name": "Japanese (Japan)", "voice": "ja-JP-NanamiNeural"},
+    "ko-KR": {"name": "Korean (Korea)", "voice": "ko-KR-SunHiNeural"},
+    "es-MX": {"name": "Spanish (Mexico)", "voice": "es-MX-DaliaNeural"},
+    "es-ES": {"name": "Spanish (Spain)", "voice": "es-ES-ElviraNeural"},
+    
+    # Additional Indian languages for better regional support
+    "ta-IN": {"name": "Tamil (India)", "voice": "ta-IN-PallaviNeural"},
+    "te-IN": {"name": "Telugu (India)", "voice": "te-IN-ShrutiNeural"},
+    "bn-IN": {"name": "Bengali (India)", "voice": "bn-IN-BashkarNeural"},
+    "kn-IN": {"name": "Kannada (India)", "voice": "kn-IN-SapnaNeural"},
+    "ml-IN": {"name": "Malayalam (India)", "voice": "ml-IN-SobhanaNeural"},
+    "mr-IN": {"name": "Marathi (India)", "voice": "mr-IN-AarohiNeural"},
+    "gu-IN": {"name": "Gujarati (India)", "voice": "gu-IN-DhwaniNeural"},
+})
+
+# Default multilingual model languages
+_DEFAULT_MULTILINGUAL_LANGUAGES: Tuple[str, ...] = (
+    "zh-CN", "en-AU", "en-CA", "en-IN", "en-GB", "en-US",
+    "fr-CA", "fr-FR", "de-DE", "hi-IN", "it-IT", "ja-JP",
+    "ko-KR", "es-MX", "es-ES",
+)
+
+# "supported_languages" entries for the transcription config, built once per language
+_LANGUAGE_ENTRIES: Mapping[str, Dict[str, str]] = MappingProxyType({
+    code: {"code": code, "name": config["name"], "voice": config["voice"]}
+    for code, config in _LANGUAGE_CONFIG.items()
+})
+_DEFAULT_SUPPORTED_LANGUAGES: Tuple[Dict[str, str], ...] = tuple(
+    _LANGUAGE_ENTRIES[code] for code in _DEFAULT_MULTILINGUAL_LANGUAGES
+)
+
+
 SYSTEM_INSTRUCTIONS = """
 You are an AI Voice Assistant designed to have natural conversations with users. 
 You should respond in a friendly, helpful manner and provide accurate information.
@@ -42,25 +253,168 @@ Keep your responses conversational and engaging.
 """
 
 
+# Subscriber events are dicts, or bytes for events already serialized to JSON
+Event = Union[Dict[str, Any], bytes]
+
+# Fixed pieces of JSON frames that are assembled from templates on hot paths
+_AUDIO_DELTA_PREFIX = b'{"type":"assistant_audio_delta","delta":"'
+_EVENT_ID_PREFIX = b'{"event_id":"'
+_AUDIO_APPEND_MIDDLE = b'","type":"input_audio_buffer.append","audio":"'
+_STRING_TAIL = b'"}'
+
+# Subscriber messages with no fields besides their type, serialized once
+_MSG_SPEECH_STARTED = jsonutil.dumps({"type": "speech_started"})
+_MSG_SPEECH_STOPPED = jsonutil.dumps({"type": "speech_stopped"})
+_MSG_INPUT_AUDIO_COMMITTED = jsonutil.dumps({"type": "input_audio_committed"})
+_MSG_AVATAR_CONNECTING = jsonutil.dumps({"type": "avatar_connecting"})
+_MSG_AVATAR_CONNECTED = jsonutil.dumps({"type": "avatar_connected"})
+_MSG_AVATAR_DISCONNECTED = jsonutil.dumps({"type": "avatar_disconnected"})
+
+# Server events whose handlers only forward a fixed message, so the frame
+# never needs a full JSON parse once its type is known
+_BODILESS_EVENT_TYPES = frozenset({
+    "input_audio_buffer.speech_started",
+    "input_audio_buffer.speech_stopped",
+    "input_audio_buffer.committed",
+    "session.avatar.connected",
+})
+_TYPE_KEY = '"type":"'
+_DELTA_KEY = '"delta":"'
+
+
+def _peek_string_field(message: Union[str, bytes], key: str) -> Optional[str]:
+    """
+    Read a top-level string field of a compact JSON text frame without parsing it.
+    
+    key is the quoted name plus ':"' (e.g. _TYPE_KEY). Returns None whenever
+    the answer is not certain (binary frame, different formatting, an object
+    opening before the key, or an escaped value), so callers fall back to a
+    full parse.
+    """
+    if not isinstance(message, str):
+        return None
+    start = message.find(key)
+    if start < 0 or message.find("{", 1, start) >= 0:
+        return None
+    start += len(key)
+    end = message.find('"', start)
+    if end < 0 or message.find("\\", start, end) >= 0:
+        return None
+    return message[start:end]
+
+
+def _peek_event_type(message: Union[str, bytes]) -> Optional[str]:
+    """Read the top-level "type" of a text frame, or None if it cannot be read cheaply."""
+    return _peek_string_field(message, _TYPE_KEY)
+
+
+class EventChannel:
+    """Bounded event buffer for one subscriber; when full, the oldest event is dropped."""
+
+    __slots__ = ("items", "ready", "dropped", "__weakref__")
+
+    def __init__(self, maxlen: int = 200):
+        self.items: Deque[Event] = deque(maxlen=maxlen)
+        self.ready = asyncio.Event()
+        # Events lost to the drop-oldest policy over the channel's lifetime
+        self.dropped = 0
+
+    def put(self, event: Event) -> bool:
+        """Append event, dropping the oldest one if full; returns True if one was dropped."""
+        items = self.items
+        full = len(items) == items.maxlen
+        if full:
+            self.dropped += 1
+        items.append(event)
+        self.ready.set()
+        return full
+
+    async def drain(self, limit: int) -> List[Event]:
+        """Wait for at least one event, then return up to limit pending events."""
+        items = self.items
+        while not items:
+            self.ready.clear()
+            await self.ready.wait()
+        popleft = items.popleft
+        return [popleft() for _ in range(min(limit, len(items)))]
+
+
 class VoiceLiveSession:
     """Manage a single Voice Live realtime session and broadcast events to subscribers."""
 
+    # Connection states for _ws_state, maintained by connect/disconnect/_receive_loop
+    _S_DISCONNECTED, _S_CONNECTING, _S_OPEN, _S_CLOSING = 0, 1, 2, 3
+
+    # Many sessions can be alive at once, so skip the per-instance __dict__
+    __slots__ = (
+        "session_id",
+        "ws",
+        "_id_prefix",
+        "_id_counter",
+        "_ws_state",
+        "_listeners",
+        "_listener_snapshots",
+        "_dead_listeners",
+        "_lock",
+        "_receive_task",
+        "_outbox",
+        "_writer_task",
+        "_avatar_future",
+        "_connected_event",
+        "_avatar_connected",
+        "_current_detected_language",
+        "_language_detection_confidence",
+        "_endpoint",
+        "_agent_connection_string",
+        "_api_version",
+        "_agent_id",
+        "_ws_endpoint",
+        "_ws_url_base",
+        "_session_config",
+        "_lang_index",
+        "_dispatch",
+        "_pending_audio",
+        "_audio_flush_handle",
+        "_audio_flush_task",
+        "_dropped_audio_frames",
+        "_session_update_body",
+    )
+
     def __init__(self, session_id: str):
         self.session_id = session_id
         self.ws: Optional[WebSocketClientProtocol] = None
-        self._listeners: Set[asyncio.Queue] = set()
+        # Event IDs are this random prefix followed by a per-session counter
+        self._id_prefix = uuid.uuid4().hex[:8]
+        self._id_counter = itertools.count()
+        # Tracked on connect/disconnect/close so send paths skip probing the socket
+        self._ws_state = self._S_DISCONNECTED
+        # Weak references, so a subscriber that is dropped without
+        # remove_event_queue is cleaned up when its channel is collected
+        # Each maps to the event types it subscribed to, or None for all types
+        self._listeners: Dict[weakref.ref, Optional[FrozenSet[str]]] = {}
+        # Event type -> subscribers interested in it, filled lazily by
+        # _listeners_for and cleared whenever the subscriber set changes
+        self._listener_snapshots: Dict[str, Tuple[weakref.ref, ...]] = {}
+        # Refs whose channels were garbage-collected; the weakref callback can run
+        # in the middle of iterating _listeners, so it only records them here and
+        # _purge_dead_listeners removes them later
+        self._dead_listeners: List[weakref.ref] = []
         self._lock = asyncio.Lock()
         self._receive_task: Optional[asyncio.Task] = None
+        # Outgoing frames are queued per connection and written by _writer_task
+        self._outbox: Optional[asyncio.Queue] = None
+        self._writer_task: Optional[asyncio.Task] = None
         self._avatar_future: Optional[asyncio.Future] = None
         self._connected_event = asyncio.Event()
         self._avatar_connected = False  # Track avatar connection state
         self._current_detected_language = None  # Track automatically detected language
         self._language_detection_confidence = 0.0  # Confidence score for language detection
 
-        # Configuration from environment variables and config.py
-        self._endpoint = os.getenv("AZURE_VOICE_LIVE_ENDPOINT")
-        self._agent_connection_string = os.getenv("AZURE_VOICE_LIVE_AGENT_CONNECTION_STRING")
-        self._api_version = os.getenv("AZURE_VOICE_LIVE_API_VERSION")
+        # Configuration from environment variables (read once, see get_settings) and config.py
+        settings = get_settings()
+        self._endpoint = settings.endpoint
+        self._agent_connection_string = settings.agent_connection_string
+        self._api_version = settings.api_version
         
         # Get agent ID from config.py instead of .env
         current_agent = agent_config.get_current_agent()
@@ -75,45 +429,69 @@ class VoiceLiveSession:
             raise ValueError("AZURE_VOICE_LIVE_AGENT_CONNECTION_STRING environment variable is required")
         if not self._api_version:
             raise ValueError("AZURE_VOICE_LIVE_API_VERSION environment variable is required")
+        
+        self._ws_endpoint = self._endpoint.rstrip('/').replace("https://", "wss://")
+        self._ws_url_base = (
+            f"{self._ws_endpoint}/voice-live/realtime"
+            f"?api-version={quote(self._api_version, safe='')}"
+            f"&agent-connection-string={quote(self._agent_connection_string, safe='')}"
+            f"&agent-id={quote(self._agent_id, safe='')}"
+        )
 
-        self._session_config = {
-            "modalities": ["text", "audio", "avatar"],
-            "input_audio_sampling_rate": 24000,
-            "turn_detection": {
-                "type": "azure_semantic_vad",
-                "threshold": 0.3,
-                "prefix_padding_ms": 200,
-                "silence_duration_ms": 200,
-                "remove_filler_words": False,
-                "end_of_utterance_detection": {
-                    "model": "semantic_detection_v1",
-                    "threshold": 0.01,
-                    "timeout": 2,
-                },
-                "auto_language_detection": True,  # Enable automatic language detection
-            },
-            "input_audio_noise_reduction": {
-                "type": "azure_deep_noise_suppression"
-            },
-            "input_audio_echo_cancellation": {
-                "type": "server_echo_cancellation"
-            },
-            "input_audio_transcription": self._build_transcription_config(),
-            "avatar": self._build_avatar_config(),
-            "voice": {
-                "name": os.getenv("AZURE_TTS_VOICE"),
-                "type": "azure-standard",
-                "temperature": 0.8,
-                "auto_language_matching": True,  # Auto-match voice to detected input language
-            },
-        }
+        # Each session mutates its own copy (language switches), never the shared template
+        self._session_config = copy.deepcopy(self._get_session_config_template(settings))
         
         # Validate TTS voice
         if not self._session_config["voice"]["name"]:
             raise ValueError("AZURE_TTS_VOICE environment variable is required")
+        
+        # Supported language code -> entry, for detection and switch lookups
+        self._lang_index: Dict[str, Dict[str, str]] = {
+            lang["code"]: lang
+            for lang in self._session_config["input_audio_transcription"]["supported_languages"]
+        }
+        
+        # Server event type -> handler, highest-frequency events first
+        self._dispatch = {
+            "response.audio.delta": self._on_audio_delta,
+            "response.audio_transcript.delta": self._on_transcript_delta,
+            "conversation.item.input_audio_transcription.delta": self._on_user_transcript_delta,
+            "error": self._on_error,
+            "response.audio.done": self._on_audio_done,
+            "response.audio_transcript.done": self._on_transcript_done,
+            "conversation.item.input_audio_transcription.completed": self._on_user_transcript_completed,
+            "input_audio_buffer.speech_started": self._on_speech_started,
+            "input_audio_buffer.speech_stopped": self._on_speech_stopped,
+            "input_audio_buffer.committed": self._on_audio_committed,
+            "session.avatar.connecting": self._on_avatar_connecting,
+            "session.avatar.connected": self._on_avatar_connected,
+            "session.avatar.disconnected": self._on_avatar_disconnected,
+            "input_audio_buffer.language_detected": self._on_language_detected,
+            "response.done": self._on_response_done,
+        }
+        
+        # Raw PCM waiting to be sent as one input_audio_buffer.append
+        self._pending_audio = bytearray()
+        self._audio_flush_handle: Optional[asyncio.TimerHandle] = None
+        # asyncio keeps only weak references to tasks, so the timer's flush is held here
+        self._audio_flush_task: Optional[asyncio.Task] = None
+        # Append frames discarded because the outbox was full
+        self._dropped_audio_frames = 0
+        
+        # session.update body sent on every (re)connect, serialized once without
+        # an event_id; reset to None whenever _session_config changes
+        self._session_update_body: Optional[bytes] = None
 
     def _ws_is_open(self) -> bool:
-        ws = self.ws
+        return self._ws_state == self._S_OPEN
+
+    def _is_ready(self) -> bool:
+        """Fast-path check for send methods; when False they await _wait_until_ready()."""
+        return self._ws_is_open() and self._connected_event.is_set()
+
+    @staticmethod
+    def _probe_ws_open(ws: Optional[WebSocketClientProtocol]) -> bool:
+        """Inspect the socket itself; used once per connect to validate the cached state."""
         if ws is None:
             return False
         state = getattr(ws, "state", None)
@@ -154,12 +532,57 @@ class VoiceLiveSession:
     async def _ensure_connection(self) -> None:
         if self._ws_is_open():
             return
-    def _build_avatar_config(self) -> Dict[str, Any]:
-        character = os.getenv("AZURE_VOICE_AVATAR_CHARACTER")
-        style = os.getenv("AZURE_VOICE_AVATAR_STYLE")
-        video_width_str = os.getenv("AZURE_VOICE_AVATAR_WIDTH")
-        video_height_str = os.getenv("AZURE_VOICE_AVATAR_HEIGHT")
-        bitrate_str = os.getenv("AZURE_VOICE_AVATAR_BITRATE")
+
+    async def _wait_until_ready(self) -> None:
+        """Slow path for send methods when the session is not yet connected."""
+        await self._connected_event.wait()
+        await self._ensure_connection()
+
+    @classmethod
+    def _get_session_config_template(cls, settings: VoiceLiveSettings) -> Dict[str, Any]:
+        """Session config shared by new sessions; built once per settings load."""
+        global _session_config_template
+        if _session_config_template is None:
+            _session_config_template = {
+                "modalities": ["text", "audio", "avatar"],
+                "input_audio_sampling_rate": 24000,
+                "turn_detection": {
+                    "type": "azure_semantic_vad",
+                    "threshold": 0.3,
+                    "prefix_padding_ms": 200,
+                    "silence_duration_ms": 200,
+                    "remove_filler_words": False,
+                    "end_of_utterance_detection": {
+                        "model": "semantic_detection_v1",
+                        "threshold": 0.01,
+                        "timeout": 2,
+                    },
+                    "auto_language_detection": True,  # Enable automatic language detection
+                },
+                "input_audio_noise_reduction": {
+                    "type": "azure_deep_noise_suppression"
+                },
+                "input_audio_echo_cancellation": {
+                    "type": "server_echo_cancellation"
+                },
+                "input_audio_transcription": cls._build_transcription_config(settings),
+                "avatar": cls._build_avatar_config(settings),
+                "voice": {
+                    "name": settings.tts_voice,
+                    "type": "azure-standard",
+                    "temperature": 0.8,
+                    "auto_language_matching": True,  # Auto-match voice to detected input language
+                },
+            }
+        return _session_config_template
+
+    @staticmethod
+    def _build_avatar_config(settings: VoiceLiveSettings) -> Dict[str, Any]:
+        character = settings.avatar_character
+        style = settings.avatar_style
+        video_width_str = settings.avatar_width
+        video_height_str = settings.avatar_height
+        bitrate_str = settings.avatar_bitrate
         
         # Validate required avatar configuration
         if not character:
@@ -187,14 +610,15 @@ class VoiceLiveSession:
             },
         }
         
-        ice_urls = os.getenv("AZURE_VOICE_AVATAR_ICE_URLS")
+        ice_urls = settings.avatar_ice_urls
         if ice_urls:
             config["ice_servers"] = [
                 {"urls": [url.strip() for url in ice_urls.split(",") if url.strip()]}
             ]
         return config
 
-    def _build_transcription_config(self) -> Dict[str, Any]:
+    @staticmethod
+    def _build_transcription_config(settings: VoiceLiveSettings) -> Dict[str, Any]:
         """
         🌍 Multi-Language Support: Build transcription configuration according to Azure Voice Live API
         Supports three modes:
@@ -203,57 +627,18 @@ class VoiceLiveSession:
         3. Multilingual configuration with up to 10 defined languages
         """
         # Get language configuration from environment
-        languages = os.getenv("AZURE_VOICE_TRANSCRIPTION_LANGUAGES", "")
-        transcription_mode = os.getenv("AZURE_VOICE_TRANSCRIPTION_MODE", "auto")  # auto, single, multi
-        
-        # Extended language mapping including Azure Voice Live supported languages
-        language_config = {
-            # Multilingual model supported languages (Azure Voice Live default)
-            "zh-CN": {"name": "Chinese (China)", "voice": "zh-CN-XiaoxiaoNeural"},
-            "en-AU": {"name": "English (Australia)", "voice": "en-AU-NatashaNeural"},
-            "en-CA": {"name": "English (Canada)", "voice": "en-CA-ClaraNeural"},
-            "en-IN": {"name": "English (India)", "voice": "en-IN-NeerjaNeural"},
-            "en-GB": {"name": "English (United Kingdom)", "voice": "en-GB-SoniaNeural"},
-            "en-US": {"name": "English (United States)", "voice": "en-US-AriaNeural"},
-            "fr-CA": {"name": "French (Canada)", "voice": "fr-CA-SylvieNeural"},
-            "fr-FR": {"name": "French (France)", "voice": "fr-FR-DeniseNeural"},
-            "de-DE": {"name": "German (Germany)", "voice": "de-DE-KatjaNeural"},
-            "hi-IN": {"name": "Hindi (India)", "voice": "hi-IN-SwaraNeural"},
-            "it-IT": {"name": "Italian (Italy)", "voice": "it-IT-ElsaNeural"},
-            "ja-JP": {"name": "Japanese (Japan)", "voice": "ja-JP-NanamiNeural"},
-            "ko-KR": {"name": "Korean (Korea)", "voice": "ko-KR-SunHiNeural"},
-            "es-MX": {"name": "Spanish (Mexico)", "voice": "es-MX-DaliaNeural"},
-            "es-ES": {"name": "Spanish (Spain)", "voice": "es-ES-ElviraNeural"},
-            
-            # Additional Indian languages for better regional support
-            "ta-IN": {"name": "Tamil (India)", "voice": "ta-IN-PallaviNeural"},
-            "te-IN": {"name": "Telugu (India)", "voice": "te-IN-ShrutiNeural"},
-            "bn-IN": {"name": "Bengali (India)", "voice": "bn-IN-BashkarNeural"},
-            "kn-IN": {"name": "Kannada (India)", "voice": "kn-IN-SapnaNeural"},
-            "ml-IN": {"name": "Malayalam (India)", "voice": "ml-IN-SobhanaNeural"},
-            "mr-IN": {"name": "Marathi (India)", "voice": "mr-IN-AarohiNeural"},
-            "gu-IN": {"name": "Gujarati (India)", "voice": "gu-IN-DhwaniNeural"},
-        }
+        languages = settings.transcription_languages
+        transcription_mode = settings.transcription_mode  # auto, single, multi
         
         # Build transcription configuration based on mode
         if transcription_mode == "auto" or not languages:
             # Mode 1: Automatic multilingual configuration (default)
-            logger.info("🌍 Using automatic multilingual configuration (default)")
+            logger.debug("🌍 Using automatic multilingual configuration (default)")
             transcription_config = {
                 "model": "azure-speech",
                 "language": "",  # Empty for automatic multilingual model
                 "mode": "automatic_multilingual",
-                "supported_languages": [
-                    {
-                        "code": code,
-                        "name": config["name"],
-                        "voice": config["voice"]
-                    }
-                    for code, config in language_config.items()
-                    if code in ["zh-CN", "en-AU", "en-CA", "en-IN", "en-GB", "en-US", 
-                               "fr-CA", "fr-FR", "de-DE", "hi-IN", "it-IT", "ja-JP", 
-                               "ko-KR", "es-MX", "es-ES"]  # Default multilingual model languages
-                ]
+                "supported_languages": list(_DEFAULT_SUPPORTED_LANGUAGES),
             }
         else:
             # Parse and validate specified languages
@@ -266,10 +651,10 @@ class VoiceLiveSession:
                 language_list = language_list[:10]
             
             for lang in language_list:
-                if lang in language_config:
+                if lang in _LANGUAGE_CONFIG:
                     supported_languages.append(lang)
-                    logger.info("🌍 Added language support: %s (%s)", 
-                              language_config[lang]["name"], lang)
+                    logger.debug("🌍 Added language support: %s (%s)", 
+                               _LANGUAGE_CONFIG[lang]["name"], lang)
                 else:
                     logger.warning("⚠️ Unsupported language code: %s", lang)
             
@@ -280,20 +665,13 @@ class VoiceLiveSession:
             
             # Mode 2 or 3: Single or multiple language configuration
             mode = "single_language" if len(supported_languages) == 1 else "multi_language"
-            logger.info("🌍 Using %s configuration with %d languages", mode, len(supported_languages))
+            logger.debug("🌍 Using %s configuration with %d languages", mode, len(supported_languages))
             
             transcription_config = {
                 "model": "azure-speech",
                 "language": ",".join(supported_languages),  # Comma-separated for specific languages
                 "mode": mode,
-                "supported_languages": [
-                    {
-                        "code": lang,
-                        "name": language_config[lang]["name"],
-                        "voice": language_config[lang]["voice"]
-                    }
-                    for lang in supported_languages
-                ]
+                "supported_languages": [_LANGUAGE_ENTRIES[lang] for lang in supported_languages]
             }
         
         logger.info("🌍 Transcription configured in '%s' mode with %d languages", 
@@ -302,57 +680,82 @@ class VoiceLiveSession:
         return transcription_config
 
     async def connect(self) -> None:
+        # Already connected: skip the lock entirely, then re-check once holding it
+        if self._ws_state == self._S_OPEN:
+            return
         async with self._lock:
-            if self._ws_is_open():
+            if self._ws_state == self._S_OPEN:
                 return
             
-            # Get authentication tokens
-            credential = DefaultAzureCredential()
+            # Get authentication tokens (cached across sessions until near expiry)
             ai_scopes = "https://ai.azure.com/.default"
             ml_scopes = "https://ml.azure.com/.default"
             
-            ai_token = await asyncio.get_event_loop().run_in_executor(
-                None, credential.get_token, ai_scopes
-            )
-            ml_token = await asyncio.get_event_loop().run_in_executor(
-                None, credential.get_token, ml_scopes
+            ai_token, ml_token = await asyncio.gather(
+                _get_cached_token(ai_scopes),
+                _get_cached_token(ml_scopes),
             )
             
-            # Build WebSocket URL  
-            logger.info("[%s] Building WebSocket URL from endpoint: %s", self.session_id, self._endpoint)
-            logger.info("[%s] API version: %s", self.session_id, self._api_version)
+            # Only the token part of the WebSocket URL changes between connects
+            ws_url = f"{self._ws_url_base}&agent-access-token={ml_token.token}"
             
-            azure_ws_endpoint = self._endpoint.rstrip('/').replace("https://", "wss://")
-            logger.info("[%s] WebSocket endpoint: %s", self.session_id, azure_ws_endpoint)
-            
-            ws_url = (f"{azure_ws_endpoint}/voice-live/realtime"
-                     f"?api-version={self._api_version}"
-                     f"&agent-connection-string={self._agent_connection_string}"
-                     f"&agent-id={self._agent_id}"
-                     f"&agent-access-token={ml_token.token}")
-            
-            logger.info("[%s] Final WebSocket URL: %s", self.session_id, ws_url[:200] + "...")
+            if logger.isEnabledFor(logging.INFO):
+                # The query string carries secrets, so only its length is logged
+                logger.info(
+                    "[%s] Connecting to %s (api-version %s, url length %d)",
+                    self.session_id, self._ws_endpoint, self._api_version, len(ws_url),
+                )
             
             headers = {
                 "x-ms-client-request-id": str(uuid.uuid4()),
                 "Authorization": f"Bearer {ai_token.token}"
             }
             
-            self.ws = await websockets.connect(ws_url, additional_headers=headers)
+            # Audio travels as base64 PCM, which permessage-deflate spends CPU on
+            # for little gain, so compression is disabled
+            self._ws_state = self._S_CONNECTING
+            try:
+                self.ws = await websockets.connect(
+                    ws_url,
+                    additional_headers=headers,
+                    compression=None,
+                    max_size=WS_MAX_MESSAGE_SIZE,
+                    ssl=_SSL_CONTEXT,
+                )
+            except BaseException:
+                self._ws_state = self._S_DISCONNECTED
+                raise
+            self._ws_state = self._S_OPEN if self._probe_ws_open(self.ws) else self._S_DISCONNECTED
             logger.info("[%s] Connected to Azure Voice Live", self.session_id)
             self._receive_task = asyncio.create_task(self._receive_loop())
+            self._outbox = asyncio.Queue(maxsize=OUTBOX_SIZE)
+            self._writer_task = asyncio.create_task(self._writer_loop(self.ws, self._outbox))
             
             # Send session update
-            await self._send("session.update", {"session": self._session_config}, allow_reconnect=False)
+            if self._session_update_body is None:
+                self._session_update_body = jsonutil.dumps(
+                    {"type": "session.update", "session": self._session_config}
+                )
+            await self._send_raw(self._with_event_id(self._session_update_body), allow_reconnect=False)
             self._connected_event.set()
 
     async def disconnect(self) -> None:
         async with self._lock:
-            if self._ws_is_open():
+            if self._ws_state == self._S_OPEN:
+                self._ws_state = self._S_CLOSING
                 await self.ws.close()
             if self._receive_task:
                 self._receive_task.cancel()
+            if self._writer_task:
+                self._writer_task.cancel()
+            # A running timer flush would otherwise reconnect once the lock is released
+            if self._audio_flush_task:
+                self._audio_flush_task.cancel()
+                self._audio_flush_task = None
             self.ws = None
+            self._close_outbox()
+            self._ws_state = self._S_DISCONNECTED
+            self._discard_pending_audio()
             self._connected_event.clear()
             logger.info("[%s] Disconnected session", self.session_id)
 
@@ -363,26 +766,124 @@ class VoiceLiveSession:
         *,
         allow_reconnect: bool = True,
     ) -> None:
+        payload = {"event_id": self._generate_id("evt_"), "type": event_type}
+        if data:
+            payload.update(data)
+        await self._send_raw(jsonutil.dumps(payload), allow_reconnect=allow_reconnect)
+
+    async def _send_raw(
+        self,
+        data: bytes,
+        *,
+        allow_reconnect: bool = True,
+        droppable: bool = False,
+    ) -> None:
+        """
+        Queue an already-serialized event for the writer task.
+        
+        droppable frames (microphone audio) are discarded when the outbox is
+        full; anything else raises RuntimeError.
+        """
         if not self._ws_is_open():
             if allow_reconnect:
                 await self.connect()
             if not self._ws_is_open():
                 raise RuntimeError("Session websocket is not connected")
-        if not self.ws:
+        self._enqueue(data, droppable=droppable)
+
+    def _enqueue(self, item: Union[bytes, asyncio.Future], *, droppable: bool = False) -> None:
+        outbox = self._outbox
+        if outbox is None:
             raise RuntimeError("Session websocket is not connected")
-        payload = {"event_id": self._generate_id("evt_"), "type": event_type}
-        if data:
-            payload.update(data)
-        await self.ws.send(json.dumps(payload))
+        try:
+            outbox.put_nowait(item)
+        except asyncio.QueueFull:
+            if droppable:
+                # A stalled writer costs some audio rather than the browser's socket
+                self._dropped_audio_frames += 1
+                if self._dropped_audio_frames % AUDIO_DROP_LOG_EVERY == 1:
+                    logger.warning(
+                        "[%s] Outbox full, dropped %d audio frames so far",
+                        self.session_id, self._dropped_audio_frames,
+                    )
+                return
+            raise RuntimeError(
+                f"Session websocket outbox is full ({OUTBOX_SIZE} frames pending)"
+            ) from None
 
-    @staticmethod
-    def _generate_id(prefix: str) -> str:
-        return f"{prefix}{int(dt.datetime.utcnow().timestamp() * 1000)}"
+    async def _wait_sent(self) -> None:
+        """
+        Wait until every frame queued so far has been written to the socket.
+        
+        Raises RuntimeError if the connection goes down first, since those
+        frames are lost.
+        """
+        marker = asyncio.get_event_loop().create_future()
+        self._enqueue(marker)
+        await marker
+
+    def _close_outbox(self) -> None:
+        """Detach the outbox, dropping its frames and failing anyone in _wait_sent."""
+        outbox, self._outbox = self._outbox, None
+        if outbox is None:
+            return
+        while True:
+            try:
+                item = outbox.get_nowait()
+            except asyncio.QueueEmpty:
+                break
+            if isinstance(item, asyncio.Future) and not item.done():
+                item.set_exception(RuntimeError("Session websocket closed before queued frames were sent"))
+
+    async def _writer_loop(self, ws: WebSocketClientProtocol, outbox: asyncio.Queue) -> None:
+        """Write queued frames to one connection in order, so senders never wait on the socket."""
+        try:
+            while True:
+                item = await outbox.get()
+                if isinstance(item, bytes):
+                    # Encoded straight to UTF-8 bytes but still sent as a text frame
+                    await ws.send(item, text=True)
+                elif not item.done():
+                    # Marker from _wait_sent: everything queued before it is written
+                    item.set_result(None)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.error("[%s] Azure Voice Live writer stopped: %s", self.session_id, exc)
+            if self.ws is ws:
+                # Nothing writes to this connection any more, so mark it down
+                # (the next send reconnects) and fail what is still queued; the
+                # receive loop finishes the cleanup once the close completes
+                self._ws_state = self._S_DISCONNECTED
+                self._close_outbox()
+            try:
+                await ws.close()
+            except Exception:  # pylint: disable=broad-except
+                pass
+
+    def _audio_append_frame(self, audio_b64: bytes) -> bytes:
+        """Build an input_audio_buffer.append frame from the template, without a dict or encoder."""
+        # Base64 never needs JSON escaping, so it is spliced in as-is
+        return b"".join((
+            _EVENT_ID_PREFIX,
+            self._generate_id("evt_").encode("ascii"),
+            _AUDIO_APPEND_MIDDLE,
+            audio_b64,
+            _STRING_TAIL,
+        ))
+
+    def _with_event_id(self, body: bytes) -> bytes:
+        """Prefix a serialized event object (without event_id) with a fresh event_id."""
+        return _EVENT_ID_PREFIX + self._generate_id("evt_").encode("ascii") + b'",' + body[1:]
+
+    def _generate_id(self, prefix: str) -> str:
+        # Random per-session prefix plus a counter: unique without reading the clock
+        return f"{prefix}{self._id_prefix}{next(self._id_counter)}"
 
     @staticmethod
     def _encode_client_sdp(client_sdp: str) -> str:
-        payload = json.dumps({"type": "offer", "sdp": client_sdp})
-        return base64.b64encode(payload.encode("utf-8")).decode("ascii")
+        payload = jsonutil.dumps({"type": "offer", "sdp": client_sdp})
+        return binascii.b2a_base64(payload, newline=False).decode("ascii")
 
     @staticmethod
     def _decode_server_sdp(server_sdp_raw: Optional[str]) -> Optional[str]:
@@ -391,43 +892,92 @@ class VoiceLiveSession:
         if server_sdp_raw.startswith("v=0"):
             return server_sdp_raw
         try:
-            decoded_bytes = base64.b64decode(server_sdp_raw)
-        except Exception:
+            decoded_bytes = binascii.a2b_base64(server_sdp_raw)
+        except (binascii.Error, ValueError):
             return server_sdp_raw
+        if decoded_bytes.lstrip()[:1] == b"{":
+            # JSON envelope: parse the bytes directly instead of decoding to text first
+            try:
+                payload = jsonutil.loads(decoded_bytes)
+            except jsonutil.JSONDecodeError:
+                payload = None
+            if isinstance(payload, dict):
+                sdp_value = payload.get("sdp")
+                if isinstance(sdp_value, str) and sdp_value:
+                    return sdp_value
         try:
-            decoded_text = decoded_bytes.decode("utf-8")
-        except Exception:
+            return decoded_bytes.decode("utf-8")
+        except UnicodeDecodeError:
             return server_sdp_raw
-        try:
-            payload = json.loads(decoded_text)
-        except json.JSONDecodeError:
-            return decoded_text
-        if isinstance(payload, dict):
-            sdp_value = payload.get("sdp")
-            if isinstance(sdp_value, str) and sdp_value:
-                return sdp_value
-        return decoded_text
-
-    def create_event_queue(self) -> asyncio.Queue:
-        queue: asyncio.Queue = asyncio.Queue(maxsize=200)
-        self._listeners.add(queue)
+
+    def create_event_queue(self, types: Optional[Iterable[str]] = None) -> EventChannel:
+        """
+        Subscribe to session events.
+        
+        Args:
+            types: Event types to receive (e.g. {"assistant_audio_delta"}); all types if None
+        """
+        self._purge_dead_listeners()
+        if len(self._listeners) >= MAX_EVENT_LISTENERS:
+            raise RuntimeError(f"Session already has {MAX_EVENT_LISTENERS} event subscribers")
+        queue = EventChannel(maxlen=200)
+        self._listeners[weakref.ref(queue, self._forget_listener)] = (
+            frozenset(types) if types is not None else None
+        )
+        self._listener_snapshots.clear()
         return queue
 
-    def remove_event_queue(self, queue: asyncio.Queue) -> None:
-        self._listeners.discard(queue)
+    def remove_event_queue(self, queue: EventChannel) -> None:
+        # Live weak references compare equal when their referents do
+        self._listeners.pop(weakref.ref(queue), None)
+        self._listener_snapshots.clear()
 
-    async def _broadcast(self, event: Dict[str, Any]) -> None:
-        if not self._listeners:
-            return
-        for queue in list(self._listeners):
-            try:
-                queue.put_nowait(event)
-            except asyncio.QueueFull:
-                logger.warning("[%s] Dropping event %s due to slow consumer", self.session_id, event.get("type"))
+    def _forget_listener(self, ref: weakref.ref) -> None:
+        """Weakref callback for channels collected without remove_event_queue."""
+        self._dead_listeners.append(ref)
+        self._listener_snapshots.clear()
+
+    def _purge_dead_listeners(self) -> None:
+        dead = self._dead_listeners
+        while dead:
+            self._listeners.pop(dead.pop(), None)
+
+    def _listeners_for(self, event_type: str) -> Tuple[weakref.ref, ...]:
+        self._purge_dead_listeners()
+        targets = tuple(
+            ref for ref, types in self._listeners.items()
+            if types is None or event_type in types
+        )
+        self._listener_snapshots[event_type] = targets
+        return targets
+
+    async def _broadcast(self, event: Event, event_type: Optional[str] = None) -> None:
+        """Deliver event to its subscribers; event_type is required for pre-serialized events."""
+        if event_type is None:
+            event_type = event["type"]
+        targets = self._listener_snapshots.get(event_type)
+        if targets is None:
+            targets = self._listeners_for(event_type)
+        if len(targets) > 1 and not isinstance(event, bytes):
+            # Serialize once here rather than once per subscriber's emitter
+            event = jsonutil.dumps(event)
+        # Slow consumers lose their oldest events rather than blocking the session
+        for ref in targets:
+            queue = ref()
+            if queue is None:
+                continue
+            # Only this subscriber's backlog is affected; others keep getting every event
+            if queue.put(event) and queue.dropped % SLOW_CONSUMER_LOG_EVERY == 1:
+                logger.warning(
+                    "[%s] Slow consumer has dropped %d events so far",
+                    self.session_id, queue.dropped,
+                )
 
     async def send_user_message(self, text: str) -> None:
-        await self._connected_event.wait()
-        await self._ensure_connection()
+        if not self._is_ready():
+            await self._wait_until_ready()
+        # Buffered microphone audio belongs before the new item and response
+        await self._flush_audio()
         await self._send(
             "conversation.item.create",
             {
@@ -440,30 +990,102 @@ class VoiceLiveSession:
         )
         await self._send("response.create")
 
-    async def send_audio_chunk(self, audio_b64: str) -> None:
-        await self._connected_event.wait()
-        await self._ensure_connection()
-        await self._send("input_audio_buffer.append", {"audio": audio_b64})
+    async def send_audio_chunk(self, audio_b64: Any) -> None:
+        """Append base64 PCM16 audio; kept for clients that send JSON audio_chunk messages."""
+        try:
+            if not isinstance(audio_b64, str):
+                raise TypeError("audio must be a base64 string")
+            # Strict, unlike a2b_base64, which silently skips invalid characters
+            pcm = base64.b64decode(audio_b64, validate=True)
+        except (TypeError, ValueError):
+            # Forward as-is so Voice Live reports the bad payload like before
+            if not self._is_ready():
+                await self._wait_until_ready()
+            await self._flush_audio()
+            await self._send("input_audio_buffer.append", {"audio": audio_b64})
+            return
+        await self.send_audio_bytes(pcm)
+
+    async def send_audio_bytes(self, pcm: bytes) -> None:
+        """
+        Append raw PCM16 audio.
+        
+        Small chunks arriving within AUDIO_COALESCE_DELAY of each other are sent
+        as a single input_audio_buffer.append event; chunks of at least
+        AUDIO_DIRECT_SEND_BYTES are sent immediately.
+        """
+        if not self._is_ready():
+            await self._wait_until_ready()
+        self._pending_audio += pcm
+        if len(pcm) >= AUDIO_DIRECT_SEND_BYTES or len(self._pending_audio) >= AUDIO_COALESCE_MAX_BYTES:
+            # Smaller chunks already buffered go out in the same frame, in order
+            await self._flush_audio()
+        elif self._audio_flush_handle is None:
+            self._audio_flush_handle = asyncio.get_event_loop().call_later(
+                AUDIO_COALESCE_DELAY, self._schedule_audio_flush
+            )
+
+    def _schedule_audio_flush(self) -> None:
+        self._audio_flush_handle = None
+        task = self._audio_flush_task
+        if task is not None and not task.done():
+            # The previous flush is still sending; check again after another window
+            self._audio_flush_handle = asyncio.get_event_loop().call_later(
+                AUDIO_COALESCE_DELAY, self._schedule_audio_flush
+            )
+            return
+        self._audio_flush_task = asyncio.ensure_future(self._flush_audio_logged())
+
+    async def _flush_audio_logged(self) -> None:
+        try:
+            await self._flush_audio()
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.error("[%s] Failed to send buffered audio: %s", self.session_id, exc)
+
+    async def _flush_audio(self) -> None:
+        """Send any buffered PCM now, ahead of whatever is sent next."""
+        if self._audio_flush_handle is not None:
+            self._audio_flush_handle.cancel()
+            self._audio_flush_handle = None
+        if not self._pending_audio:
+            return
+        pcm = bytes(self._pending_audio)
+        self._pending_audio.clear()
+        await self._send_raw(
+            self._audio_append_frame(binascii.b2a_base64(pcm, newline=False)),
+            droppable=True,
+        )
+
+    def _discard_pending_audio(self) -> None:
+        if self._audio_flush_handle is not None:
+            self._audio_flush_handle.cancel()
+            self._audio_flush_handle = None
+        self._pending_audio.clear()
 
     async def commit_audio(self) -> None:
-        await self._connected_event.wait()
-        await self._ensure_connection()
+        if not self._is_ready():
+            await self._wait_until_ready()
+        await self._flush_audio()
         await self._send("input_audio_buffer.commit")
+        # The commit is only meaningful if it and the audio before it went out
+        await self._wait_sent()
 
     async def clear_audio(self) -> None:
-        await self._connected_event.wait()
-        await self._ensure_connection()
+        if not self._is_ready():
+            await self._wait_until_ready()
+        self._discard_pending_audio()
         await self._send("input_audio_buffer.clear")
 
     async def request_response(self) -> None:
-        await self._connected_event.wait()
-        await self._ensure_connection()
+        if not self._is_ready():
+            await self._wait_until_ready()
+        await self._flush_audio()
         await self._send("response.create")
 
     async def disconnect_avatar(self):
         """Disconnect the avatar and reset connection state."""
-        await self._connected_event.wait()
-        await self._ensure_connection()
+        if not self._is_ready():
+            await self._wait_until_ready()
         
         if not self._avatar_connected:
             logger.warning("[%s] Avatar not connected, nothing to disconnect", self.session_id)
@@ -481,8 +1103,8 @@ class VoiceLiveSession:
         logger.info("[%s] Avatar disconnected", self.session_id)
 
     async def connect_avatar(self, client_sdp: str) -> str:
-        await self._connected_event.wait()
-        await self._ensure_connection()
+        if not self._is_ready():
+            await self._wait_until_ready()
         
         # Check if avatar is already connected
         if self._avatar_connected:
@@ -494,7 +1116,8 @@ class VoiceLiveSession:
             logger.warning("[%s] Avatar connection already in progress, cancelling previous", self.session_id)
             self._avatar_future.cancel()
             
-        future: asyncio.Future = asyncio.get_event_loop().create_future()
+        loop = asyncio.get_event_loop()
+        future: asyncio.Future = loop.create_future()
         self._avatar_future = future
         encoded_sdp = self._encode_client_sdp(client_sdp)
         payload = {
@@ -505,13 +1128,18 @@ class VoiceLiveSession:
         logger.info("[%s] Sending avatar connect request", self.session_id)
         await self._send("session.avatar.connect", payload)
         
+        # A plain timer on the future is enough for this one-shot wait
+        timeout_handle = loop.call_later(AVATAR_SDP_TIMEOUT, _expire_future, future)
         try:
-            server_sdp = await asyncio.wait_for(future, timeout=30)
+            server_sdp = await future
             logger.info("[%s] Avatar SDP negotiation successful", self.session_id)
             self._avatar_connected = True  # Mark avatar as connected
             return server_sdp
         except asyncio.TimeoutError:
-            logger.error("[%s] Avatar SDP negotiation timed out after 30 seconds", self.session_id)
+            logger.error(
+                "[%s] Avatar SDP negotiation timed out after %s seconds",
+                self.session_id, AVATAR_SDP_TIMEOUT,
+            )
             raise RuntimeError("Avatar connection timed out - Azure Voice Live did not respond")
         except asyncio.CancelledError:
             logger.error("[%s] Avatar SDP negotiation was cancelled", self.session_id)
@@ -520,6 +1148,7 @@ class VoiceLiveSession:
             logger.error("[%s] Avatar SDP negotiation failed: %s", self.session_id, str(e))
             raise RuntimeError(f"Avatar connection failed: {str(e)}")
         finally:
+            timeout_handle.cancel()
             self._avatar_future = None
 
     async def switch_language(self, language_code: str) -> bool:
@@ -532,52 +1161,20 @@ class VoiceLiveSession:
         Returns:
             bool: True if language switch was successful
         """
-        await self._connected_event.wait()
-        await self._ensure_connection()
-        
-        # Get supported languages from transcription config
-        transcription_config = self._session_config.get("input_audio_transcription", {})
-        supported_languages = transcription_config.get("supported_languages", [])
+        if not self._is_ready():
+            await self._wait_until_ready()
         
         # Find the language configuration
-        language_info = None
-        for lang in supported_languages:
-            if lang["code"] == language_code:
-                language_info = lang
-                break
+        language_info = self._lang_index.get(language_code)
         
         if not language_info:
             logger.error("🌍 Language %s not supported. Available: %s", 
-                        language_code, [lang["code"] for lang in supported_languages])
+                        language_code, list(self._lang_index))
             return False
         
         try:
-            # Update voice configuration
-            voice_update = {
-                "voice": {
-                    "name": language_info["voice"],
-                    "type": "azure-standard",
-                    "temperature": 0.8,
-                }
-            }
-            
-            # Update transcription language
-            transcription_update = {
-                "input_audio_transcription": {
-                    "model": "azure-speech",  
-                    "language": language_code,
-                    "primary_language": language_code
-                }
-            }
-            
-            # Send session updates
-            await self._send("session.update", {
-                "session": {**voice_update, **transcription_update}
-            })
-            
-            # Update local configuration
-            self._session_config["voice"]["name"] = language_info["voice"]
-            self._session_config["input_audio_transcription"]["language"] = language_code
+            # Switch both the voice and the transcription language
+            await self._apply_language(language_info, transcription=True)
             
             logger.info("🌍 Language switched to: %s (%s) with voice: %s", 
                        language_info["name"], language_code, language_info["voice"])
@@ -587,6 +1184,18 @@ class VoiceLiveSession:
             logger.error("🌍 Failed to switch language to %s: %s", language_code, str(e))
             return False
 
+    async def _apply_language(self, language_info: Dict[str, str], *, transcription: bool) -> None:
+        """Send the cached language session.update and mirror it in the local session config."""
+        code = language_info["code"] if transcription else None
+        await self._send_raw(self._with_event_id(_language_update_body(language_info["voice"], code)))
+        # Callers report success, so make sure the update actually went out
+        await self._wait_sent()
+        
+        self._session_config["voice"]["name"] = language_info["voice"]
+        if code is not None:
+            self._session_config["input_audio_transcription"]["language"] = code
+        self._session_update_body = None
+
     def get_supported_languages(self) -> list:
         """
         🌍 Get list of supported languages
@@ -625,19 +1234,13 @@ class VoiceLiveSession:
         self._current_detected_language = detected_language
         self._language_detection_confidence = confidence
         
-        logger.info("🌍 Language detected: %s (confidence: %.2f)", detected_language, confidence)
+        logger.debug("🌍 Language detected: %s (confidence: %.2f)", detected_language, confidence)
         
         # Get current voice language
         current_voice_lang = self._session_config["voice"]["name"]
-        transcription_config = self._session_config.get("input_audio_transcription", {})
-        supported_languages = transcription_config.get("supported_languages", [])
         
         # Find if detected language is supported and different from current
-        target_language_info = None
-        for lang in supported_languages:
-            if lang["code"] == detected_language:
-                target_language_info = lang
-                break
+        target_language_info = self._lang_index.get(detected_language)
         
         if target_language_info and current_voice_lang != target_language_info["voice"]:
             # Auto-switch voice to match detected input language
@@ -666,22 +1269,8 @@ class VoiceLiveSession:
             bool: True if switch was successful
         """
         try:
-            # Update voice configuration for response
-            voice_update = {
-                "voice": {
-                    "name": language_info["voice"],
-                    "type": "azure-standard",
-                    "temperature": 0.8,
-                }
-            }
-            
-            # Send session update for voice only (keep transcription multi-language)
-            await self._send("session.update", {
-                "session": voice_update
-            })
-            
-            # Update local voice configuration
-            self._session_config["voice"]["name"] = language_info["voice"]
+            # Switch the voice only (keep transcription multi-language)
+            await self._apply_language(language_info, transcription=False)
             
             logger.info("🌍 Auto-switched voice to: %s (%s) with voice: %s", 
                        language_info["name"], language_code, language_info["voice"])
@@ -704,120 +1293,181 @@ class VoiceLiveSession:
             "current_voice_language": self.get_current_language()
         }
 
+    async def _on_error(self, event: Dict[str, Any]) -> None:
+        await self._broadcast({"type": "error", "payload": event})
+
+    async def _forward_audio_delta(self, delta: str) -> None:
+        # Base64 needs no JSON escaping, so the browser frame is built directly
+        # and passed through to subscribers already serialized
+        await self._broadcast(
+            _AUDIO_DELTA_PREFIX + delta.encode("ascii") + _STRING_TAIL,
+            "assistant_audio_delta",
+        )
+
+    async def _on_audio_delta(self, event: Dict[str, Any]) -> None:
+        delta = event.get("delta")
+        if isinstance(delta, str):
+            await self._forward_audio_delta(delta)
+            return
+        # The decoded event is owned by the receive loop, so retag it instead of copying
+        event["type"] = "assistant_audio_delta"
+        await self._broadcast(event)
+
+    async def _on_audio_done(self, event: Dict[str, Any]) -> None:
+        await self._broadcast({"type": "assistant_audio_done", "payload": event})
+
+    async def _on_transcript_delta(self, event: Dict[str, Any]) -> None:
+        await self._broadcast(
+            {
+                "type": "assistant_transcript_delta",
+                "delta": event.get("delta"),
+                "item_id": event.get("item_id"),
+            }
+        )
+
+    async def _on_transcript_done(self, event: Dict[str, Any]) -> None:
+        await self._broadcast(
+            {
+                "type": "assistant_transcript_done",
+                "transcript": event.get("transcript"),
+                "item_id": event.get("item_id"),
+            }
+        )
+
+    async def _on_user_transcript_completed(self, event: Dict[str, Any]) -> None:
+        transcript_data = {
+            "type": "user_transcript_completed",
+            "transcript": event.get("transcript"),
+            "item_id": event.get("item_id"),
+        }
+        
+        # 🌍 Handle automatic language detection
+        detected_language = event.get("detected_language")
+        language_confidence = event.get("language_confidence", 0.0)
+        
+        if detected_language and language_confidence > 0.7:  # High confidence threshold
+            await self._handle_language_detection(detected_language, language_confidence)
+            transcript_data["detected_language"] = detected_language
+            transcript_data["language_confidence"] = language_confidence
+        
+        await self._broadcast(transcript_data)
+
+    async def _on_user_transcript_delta(self, event: Dict[str, Any]) -> None:
+        # Handle real-time transcription with language info
+        transcript_delta = {
+            "type": "user_transcript_delta",
+            "delta": event.get("delta"),
+            "item_id": event.get("item_id"),
+        }
+        # Check for language information in delta
+        if "language" in event:
+            transcript_delta["detected_language"] = event.get("language")
+        await self._broadcast(transcript_delta)
+
+    async def _on_speech_started(self, event: Dict[str, Any]) -> None:
+        await self._broadcast(_MSG_SPEECH_STARTED, "speech_started")
+
+    async def _on_speech_stopped(self, event: Dict[str, Any]) -> None:
+        await self._broadcast(_MSG_SPEECH_STOPPED, "speech_stopped")
+
+    async def _on_audio_committed(self, event: Dict[str, Any]) -> None:
+        await self._broadcast(_MSG_INPUT_AUDIO_COMMITTED, "input_audio_committed")
+
+    async def _on_avatar_connecting(self, event: Dict[str, Any]) -> None:
+        logger.info("[%s] Received session.avatar.connecting event", self.session_id)
+        server_sdp = event.get("server_sdp")
+        decoded_sdp = self._decode_server_sdp(server_sdp)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "[%s] Raw server_sdp length: %s, decoded SDP length: %s",
+                self.session_id,
+                len(server_sdp) if server_sdp else "None",
+                len(decoded_sdp) if decoded_sdp else "None",
+            )
+        if self._avatar_future and not self._avatar_future.done():
+            if decoded_sdp is None:
+                logger.error("[%s] Empty server SDP received", self.session_id)
+                self._avatar_future.set_exception(RuntimeError("Empty server SDP"))
+            else:
+                logger.info("[%s] Setting SDP result in future", self.session_id)
+                self._avatar_future.set_result(decoded_sdp)
+        else:
+            logger.warning("[%s] No avatar future waiting for SDP", self.session_id)
+        await self._broadcast(_MSG_AVATAR_CONNECTING, "avatar_connecting")
+
+    async def _on_avatar_connected(self, event: Dict[str, Any]) -> None:
+        await self._broadcast(_MSG_AVATAR_CONNECTED, "avatar_connected")
+
+    async def _on_avatar_disconnected(self, event: Dict[str, Any]) -> None:
+        logger.info("[%s] Received session.avatar.disconnected event", self.session_id)
+        self._avatar_connected = False  # Reset avatar connection state
+        if self._avatar_future and not self._avatar_future.done():
+            self._avatar_future.cancel()
+            self._avatar_future = None
+        await self._broadcast(_MSG_AVATAR_DISCONNECTED, "avatar_disconnected")
+
+    async def _on_language_detected(self, event: Dict[str, Any]) -> None:
+        # 🌍 Handle language detection events from Azure Speech
+        detected_lang = event.get("language")
+        confidence = event.get("confidence", 0.0)
+        if detected_lang and confidence > 0.6:
+            await self._handle_language_detection(detected_lang, confidence)
+        await self._broadcast({
+            "type": "language_detected",
+            "language": detected_lang,
+            "confidence": confidence,
+            "payload": event
+        })
+
+    async def _on_response_done(self, event: Dict[str, Any]) -> None:
+        await self._broadcast({"type": "response_done", "payload": event})
+
+    async def _on_unknown(self, event: Dict[str, Any]) -> None:
+        # 🌍 Log unknown events that might contain language information.
+        # Only keys and the type are checked; stringifying the whole event
+        # would cost O(payload) on every response.done.
+        event_type = event.get("type")
+        if (
+            "language" in event
+            or "detected_language" in event
+            or (isinstance(event_type, str) and "detect" in event_type)
+        ):
+            logger.info("🌍 Received potential language event: %s", event_type)
+        await self._broadcast({"type": "event", "payload": event})
+
     async def _receive_loop(self) -> None:
         ws = self.ws
         if ws is None:
             return
+        # Bound once, since the loop runs for every audio delta
+        dispatch = self._dispatch
+        on_unknown = self._on_unknown
+        peek_type = _peek_event_type
+        peek_field = _peek_string_field
+        forward_audio_delta = self._forward_audio_delta
+        bodiless = _BODILESS_EVENT_TYPES
+        loads = jsonutil.loads
+        decode_error = jsonutil.JSONDecodeError
         try:
             async for message in ws:
+                event_type = peek_type(message)
+                if event_type in bodiless:
+                    await dispatch[event_type]({"type": event_type})
+                    continue
+                if event_type == "response.audio.delta":
+                    # Only the delta is forwarded, so slice it out of the frame
+                    delta = peek_field(message, _DELTA_KEY)
+                    if delta is not None:
+                        await forward_audio_delta(delta)
+                        continue
+                
                 try:
-                    event = json.loads(message)
-                except json.JSONDecodeError:
+                    event = loads(message)
+                except decode_error:
                     logger.warning("[%s] Failed to decode message", self.session_id)
                     continue
                 
-                event_type = event.get("type")
-                
-                if event_type == "error":
-                    await self._broadcast({"type": "error", "payload": event})
-                elif event_type == "response.audio.delta":
-                    await self._broadcast({"type": "assistant_audio_delta", "delta": event.get("delta")})
-                elif event_type == "response.audio.done":
-                    await self._broadcast({"type": "assistant_audio_done", "payload": event})
-                elif event_type == "response.audio_transcript.delta":
-                    await self._broadcast(
-                        {
-                            "type": "assistant_transcript_delta",
-                            "delta": event.get("delta"),
-                            "item_id": event.get("item_id"),
-                        }
-                    )
-                elif event_type == "response.audio_transcript.done":
-                    await self._broadcast(
-                        {
-                            "type": "assistant_transcript_done",
-                            "transcript": event.get("transcript"),
-                            "item_id": event.get("item_id"),
-                        }
-                    )
-                elif event_type == "conversation.item.input_audio_transcription.completed":
-                    transcript_data = {
-                        "type": "user_transcript_completed",
-                        "transcript": event.get("transcript"),
-                        "item_id": event.get("item_id"),
-                    }
-                    
-                    # 🌍 Handle automatic language detection
-                    detected_language = event.get("detected_language")
-                    language_confidence = event.get("language_confidence", 0.0)
-                    
-                    if detected_language and language_confidence > 0.7:  # High confidence threshold
-                        await self._handle_language_detection(detected_language, language_confidence)
-                        transcript_data["detected_language"] = detected_language
-                        transcript_data["language_confidence"] = language_confidence
-                    
-                    await self._broadcast(transcript_data)
-                elif event_type == "input_audio_buffer.speech_started":
-                    await self._broadcast({"type": "speech_started"})
-                elif event_type == "input_audio_buffer.speech_stopped":
-                    await self._broadcast({"type": "speech_stopped"})
-                elif event_type == "input_audio_buffer.committed":
-                    await self._broadcast({"type": "input_audio_committed"})
-                elif event_type == "session.avatar.connecting":
-                    logger.info("[%s] Received session.avatar.connecting event", self.session_id)
-                    server_sdp = event.get("server_sdp")
-                    logger.info("[%s] Raw server_sdp length: %s", self.session_id, len(server_sdp) if server_sdp else "None")
-                    decoded_sdp = self._decode_server_sdp(server_sdp)
-                    logger.info("[%s] Decoded SDP length: %s", self.session_id, len(decoded_sdp) if decoded_sdp else "None")
-                    if self._avatar_future and not self._avatar_future.done():
-                        if decoded_sdp is None:
-                            logger.error("[%s] Empty server SDP received", self.session_id)
-                            self._avatar_future.set_exception(RuntimeError("Empty server SDP"))
-                        else:
-                            logger.info("[%s] Setting SDP result in future", self.session_id)
-                            self._avatar_future.set_result(decoded_sdp)
-                    else:
-                        logger.warning("[%s] No avatar future waiting for SDP", self.session_id)
-                    await self._broadcast({"type": "avatar_connecting"})
-                elif event_type == "session.avatar.connected":
-                    await self._broadcast({"type": "avatar_connected"})
-                elif event_type == "session.avatar.disconnected":
-                    logger.info("[%s] Received session.avatar.disconnected event", self.session_id)
-                    self._avatar_connected = False  # Reset avatar connection state
-                    if self._avatar_future and not self._avatar_future.done():
-                        self._avatar_future.cancel()
-                        self._avatar_future = None
-                    await self._broadcast({"type": "avatar_disconnected"})
-                elif event_type == "input_audio_buffer.language_detected":
-                    # 🌍 Handle language detection events from Azure Speech
-                    detected_lang = event.get("language")
-                    confidence = event.get("confidence", 0.0)
-                    if detected_lang and confidence > 0.6:
-                        await self._handle_language_detection(detected_lang, confidence)
-                    await self._broadcast({
-                        "type": "language_detected",
-                        "language": detected_lang,
-                        "confidence": confidence,
-                        "payload": event
-                    })
-                elif event_type == "conversation.item.input_audio_transcription.delta":
-                    # Handle real-time transcription with language info
-                    transcript_delta = {
-                        "type": "user_transcript_delta",
-                        "delta": event.get("delta"),
-                        "item_id": event.get("item_id"),
-                    }
-                    # Check for language information in delta
-                    if "language" in event:
-                        transcript_delta["detected_language"] = event.get("language")
-                    await self._broadcast(transcript_delta)
-                elif event_type == "response.done":
-                    await self._broadcast({"type": "response_done", "payload": event})
-                else:
-                    # 🌍 Log unknown events that might contain language information
-                    if "language" in event or "detected" in str(event).lower():
-                        logger.info("🌍 Received potential language event: %s", event_type)
-                    await self._broadcast({"type": "event", "payload": event})
+                await dispatch.get(event.get("type"), on_unknown)(event)
                     
         except Exception as exc:  # pylint: disable=broad-except
             logger.exception("[%s] Azure Voice Live websocket receive loop ended with error", self.session_id)
@@ -825,4 +1475,8 @@ class VoiceLiveSession:
         finally:
             if self.ws is ws:
                 self.ws = None
-            logger.info("[%s] Azure Voice Live websocket closed", self.session_id)
\ No newline at end of file
+                self._ws_state = self._S_DISCONNECTED
+                self._close_outbox()
+                if self._writer_task:
+                    self._writer_task.cancel()
+            logger.info("[%s] Azure Voice Live websocket closed", self.session_id)
@@ -126,6 +126,9 @@ const App: React.FC = () => {
 
       // Connect WebSocket - use proxy on port 3000 which forwards to backend on port 8000
       const websocket = new WebSocket(`ws://localhost:3000/api/ws/${data.session_id}`);
+      // Events arrive as UTF-8 JSON in binary frames
+      websocket.binaryType = 'arraybuffer';
+      const decoder = new TextDecoder();
       
       websocket.onopen = () => {
         setIsConnected(true);
@@ -134,8 +137,14 @@ const App: React.FC = () => {
       };
 
       websocket.onmessage = (event) => {
-        const message = JSON.parse(event.data);
-        handleWebSocketMessage(message);
+        const text = typeof event.data === 'string' ? event.data : decoder.decode(event.data);
+        const message = JSON.parse(text);
+        // The backend coalesces queued events into a single batch frame
+        if (message.type === 'batch') {
+          message.events.forEach(handleWebSocketMessage);
+        } else {
+          handleWebSocketMessage(message);
+        }
       };
 
       websocket.onclose = () => {
@@ -519,15 +528,8 @@ const App: React.FC = () => {
           pcmData[i] = s < 0 ? s * 0x8000 : s * 0x7FFF;
         }
 
-        // Convert to base64
-        const bytes = new Uint8Array(pcmData.buffer);
-        const base64 = btoa(String.fromCharCode(...bytes));
-
-        // Send PCM audio chunk
-        ws.send(JSON.stringify({
-          type: 'audio_chunk',
-          audio: base64
-        }));
+        // Send PCM audio chunk as a binary frame; the backend base64-encodes it once
+        ws.send(pcmData.buffer);
       };
 
       // Store all references for cleanup